@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from inference_executor import InferenceExecutor, InferenceQueueFullError
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionBatcher:
+    """Coalesces concurrent single predictions into one vectorized model call.
+
+    Requests are held for at most ``max_wait_ms`` or until ``max_batch_size``
+    are queued, then scored together through ``predict_prices``. Each caller
+    awaits its own result; if the combined call fails, the batch is retried
+    row by row so one bad request cannot fail its neighbours.
+    """
+
+    def __init__(self, executor: InferenceExecutor, max_batch_size: int = 32, max_wait_ms: float = 3.0):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    async def predict(self, flight_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue one prediction and wait for the batch that scores it"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((flight_params, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+
+        try:
+            results = await self.executor.run_model('predict_prices', [params for params, _ in batch])
+        except InferenceQueueFullError as e:
+            results = [e] * len(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                results = [e]
+            else:
+                logger.warning(f"Batched prediction of {len(batch)} requests failed, retrying individually: {str(e)}")
+                results = await asyncio.gather(
+                    *[self.executor.run_model('predict_price', params) for params, _ in batch],
+                    return_exceptions=True
+                )
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+            'pending': len(self._pending),
+            'batches': self.batches,
+            'items': self.items,
+            'largest_batch': self.largest_batch,
+            'avg_batch_size': round(self.items / self.batches, 2) if self.batches else 0.0
+        }
@@ -0,0 +1,144 @@
+import copy
+import json
+import os
+from statistics import NormalDist
+from typing import Any, Dict, Sequence
+
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+try:
+    from xgboost import XGBRegressor
+except ImportError:  # only needed for the xgboost backend
+    XGBRegressor = None
+
+BOOSTED_BACKENDS = ('xgboost', 'hist_gb')
+
+
+class QuantileBoostedModel:
+    """Gradient-boosted regressor predicting a lower, median and upper price quantile.
+
+    The median is the point prediction. The spread between the outer
+    quantiles replaces the per-tree standard deviation that forests provide.
+    XGBoost fits all three quantiles in one multi-quantile model.
+    HistGradientBoosting fits one model per quantile.
+    """
+
+    def __init__(self, backend: str, params: Dict[str, Any], quantiles: Sequence[float] = (0.1, 0.9)):
+        if backend not in BOOSTED_BACKENDS:
+            raise ValueError(f"Unknown boosted backend: {backend}")
+        if backend == 'xgboost' and XGBRegressor is None:
+            raise ImportError("xgboost is not installed")
+
+        self.backend = backend
+        self.params = dict(params)
+        self.quantiles = (quantiles[0], 0.5, quantiles[1])
+        self.models = []
+        # Rounds from the last full fit; incremental growth is bounded relative to it
+        self.base_rounds = 0
+
+    def _new_xgboost(self, **overrides):
+        params = {'n_jobs': -1, **self.params, **overrides}
+        return XGBRegressor(
+            objective='reg:quantileerror', quantile_alpha=np.array(self.quantiles),
+            random_state=42, **params
+        )
+
+    def _new_models(self) -> list:
+        if self.backend == 'xgboost':
+            return [self._new_xgboost()]
+        return [
+            HistGradientBoostingRegressor(loss='quantile', quantile=quantile, random_state=42, **self.params)
+            for quantile in self.quantiles
+        ]
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> 'QuantileBoostedModel':
+        models = self._new_models()
+        for model in models:
+            model.fit(X, y)
+        self.models = models
+        self.base_rounds = self.n_rounds
+        return self
+
+    @property
+    def n_rounds(self) -> int:
+        """Boosting rounds in the ensemble"""
+        if self.backend == 'xgboost':
+            return self.models[0].get_booster().num_boosted_rounds()
+        return self.models[0].n_iter_
+
+    def rounds_left(self, max_added_rounds: int) -> int:
+        """Rounds that can still be grown before max_added_rounds beyond the last full fit"""
+        return self.base_rounds + max_added_rounds - self.n_rounds
+
+    def grow(self, X: np.ndarray, y: np.ndarray, n_rounds: int, max_added_rounds: int) -> 'QuantileBoostedModel':
+        """Copy of this model with n_rounds more boosting rounds fitted on (X, y).
+
+        Each round corrects the ones before it, so unlike forest trees the
+        oldest rounds cannot be evicted; once max_added_rounds have been grown
+        since the last full fit, a full retrain is needed.
+        """
+        if n_rounds > self.rounds_left(max_added_rounds):
+            raise ValueError(f"Boosted model has grown {self.n_rounds - self.base_rounds} rounds since its last "
+                             f"full fit; retrain fully to go past {max_added_rounds}")
+
+        grown = QuantileBoostedModel(self.backend, self.params, (self.quantiles[0], self.quantiles[2]))
+        grown.base_rounds = self.base_rounds
+        if self.backend == 'xgboost':
+            booster = self._new_xgboost(n_estimators=n_rounds)
+            booster.fit(X, y, xgb_model=self.models[0].get_booster())
+            grown.models = [booster]
+        else:
+            grown.models = []
+            for model in self.models:
+                model = copy.deepcopy(model)
+                model.set_params(warm_start=True, max_iter=model.n_iter_ + n_rounds)
+                grown.models.append(model.fit(X, y))
+        return grown
+
+    def predict_quantiles(self, X: np.ndarray) -> np.ndarray:
+        """(n_samples, 3) matrix of lower, median and upper predictions"""
+        if self.backend == 'xgboost':
+            predictions = self.models[0].predict(X)
+        else:
+            predictions = np.column_stack([model.predict(X) for model in self.models])
+        # Separately fitted quantiles can cross; sorting restores lower <= median <= upper
+        return np.sort(np.asarray(predictions, dtype=np.float64).reshape(len(X), 3), axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.predict_quantiles(X)[:, 1]
+
+    def predict_distribution(self, X: np.ndarray):
+        """Median, implied standard deviation and interval bounds per row"""
+        lower, median, upper = self.predict_quantiles(X).T
+        # Width of the interval in standard deviations if prices were normally distributed
+        z_width = NormalDist().inv_cdf(self.quantiles[2]) - NormalDist().inv_cdf(self.quantiles[0])
+        return median, (upper - lower) / z_width, lower, upper
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        if self.backend == 'xgboost':
+            # Native format, independent of the Python package version that wrote it
+            self.models[0].save_model(os.path.join(directory, 'model.json'))
+        else:
+            joblib.dump(self.models, os.path.join(directory, 'models.pkl'))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'backend': self.backend, 'params': self.params, 'quantiles': list(self.quantiles),
+                       'base_rounds': self.base_rounds}, f)
+
+    @classmethod
+    def load(cls, directory: str) -> 'QuantileBoostedModel':
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        quantiles = meta['quantiles']
+        model = cls(meta['backend'], meta['params'], (quantiles[0], quantiles[2]))
+        if model.backend == 'xgboost':
+            booster = XGBRegressor()
+            booster.load_model(os.path.join(directory, 'model.json'))
+            model.models = [booster]
+        else:
+            model.models = joblib.load(os.path.join(directory, 'models.pkl'))
+        # Artifacts saved before base_rounds was recorded count as freshly fitted
+        model.base_rounds = meta.get('base_rounds', model.n_rounds)
+        return model
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class TTLLRUCache:
+    """Thread-safe, size-bounded LRU cache whose entries expire after a fixed TTL"""
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Return the cached value for key, or default if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store value under key, evicting the least recently used entries when full"""
+        if self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry, keeping the hit/miss counters"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SingleFlightCache:
+    """Async result cache with single-flight loading and optional stale-while-revalidate.
+
+    Concurrent misses for the same key share one in-flight load. Entries are
+    fresh for ``fresh_ttl`` seconds; for another ``stale_ttl`` seconds an entry
+    that has been read at least ``swr_min_hits`` times is still served while a
+    background load refreshes it. Values that ``is_complete`` rejects, such as
+    empty or partial results, are kept for only ``incomplete_ttl`` seconds
+    (not at all when it is 0) and are never served stale. Must only be used
+    from one event loop.
+    """
+
+    def __init__(self, max_size: int = 512, fresh_ttl: float = 60, stale_ttl: float = 0, swr_min_hits: int = 3,
+                 incomplete_ttl: float = 0, is_complete: Optional[Callable[[Any], bool]] = None):
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self.swr_min_hits = swr_min_hits
+        self.incomplete_ttl = incomplete_ttl
+        self.is_complete = is_complete
+        self._entries = TTLLRUCache(max_size=max_size, ttl_seconds=fresh_ttl + stale_ttl)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.incomplete_loads = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, loading it at most once across concurrent callers"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry['hits'] += 1
+            age = time.monotonic() - entry['loaded_at']
+            if age < (self.fresh_ttl if entry['complete'] else self.incomplete_ttl):
+                self.fresh_hits += 1
+                return entry['value']
+            if entry['complete'] and entry['hits'] >= self.swr_min_hits:
+                self.stale_hits += 1
+                self._start_load(key, loader)
+                return entry['value']
+
+        # Shield so a cancelled caller does not cancel the load other callers share
+        return await asyncio.shield(self._start_load(key, loader))
+
+    def _start_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        self.loads += 1
+        task = asyncio.create_task(self._load(key, loader))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish_load(key, done))
+        return task
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        value = await loader()
+        complete = self.is_complete is None or self.is_complete(value)
+        if not complete:
+            self.incomplete_loads += 1
+            if self.incomplete_ttl <= 0:
+                return value
+        previous = self._entries.get(key)
+        self._entries.set(key, {
+            'value': value,
+            'loaded_at': time.monotonic(),
+            'complete': complete,
+            'hits': previous['hits'] if previous is not None else 0
+        })
+        return value
+
+    def _finish_load(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Background refreshes have no awaiting caller, so surface their failures here
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Cache load for {key} failed: {task.exception()}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        entry_stats = self._entries.stats()
+        return {
+            'size': entry_stats['size'],
+            'max_size': entry_stats['max_size'],
+            'fresh_ttl_seconds': self.fresh_ttl,
+            'stale_ttl_seconds': self.stale_ttl,
+            'incomplete_ttl_seconds': self.incomplete_ttl,
+            'fresh_hits': self.fresh_hits,
+            'stale_hits': self.stale_hits,
+            'loads': self.loads,
+            'coalesced': self.coalesced,
+            'incomplete_loads': self.incomplete_loads,
+            'in_flight': len(self._inflight)
+        }
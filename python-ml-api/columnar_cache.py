@@ -0,0 +1,97 @@
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+class ColumnarCacheWriter:
+    """Appends DataFrame chunks to one raw binary file per column.
+
+    Numeric and datetime columns are written as their NumPy buffers.
+    Categorical columns are written as int32 codes against a category list
+    that grows as new values appear, so the strings are stored only once.
+    Files are written to a temporary directory that replaces ``directory``
+    on ``close()``, so readers never see a partially written cache.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._staging = f'{directory}.tmp'
+        self._columns: Dict[str, Dict] = {}
+        self._category_codes: Dict[str, Dict[str, int]] = {}
+        self.rows = 0
+
+        shutil.rmtree(self._staging, ignore_errors=True)
+        os.makedirs(self._staging)
+
+    def append(self, frame: pd.DataFrame) -> None:
+        for name in frame.columns:
+            values = self._column_values(name, frame[name])
+            spec = self._columns.setdefault(name, {'dtype': values.dtype.str})
+            if spec['dtype'] != values.dtype.str:
+                values = values.astype(spec['dtype'])
+            with open(os.path.join(self._staging, f'{name}.bin'), 'ab') as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+        self.rows += len(frame)
+
+    def _column_values(self, name: str, column: pd.Series) -> np.ndarray:
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            values = column.to_numpy()
+            if values.dtype == object:
+                raise TypeError(f"Column {name} must be numeric, datetime or categorical")
+            return values
+
+        # Translate this chunk's categories to the cache-wide codes, -1 stays missing
+        codes = self._category_codes.setdefault(name, {})
+        for category in column.cat.categories:
+            codes.setdefault(category, len(codes))
+        chunk_to_cache = np.array([codes[c] for c in column.cat.categories] + [-1], dtype=np.int32)
+        return chunk_to_cache[column.cat.codes.to_numpy()]
+
+    def abort(self) -> None:
+        """Discard the partially written files, leaving any published cache untouched"""
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+    def close(self) -> 'ColumnarCache':
+        """Write the metadata, publish the cache and open it for reading"""
+        for name, codes in self._category_codes.items():
+            self._columns[name]['categories'] = list(codes)
+        with open(os.path.join(self._staging, 'meta.json'), 'w') as f:
+            json.dump({'rows': self.rows, 'columns': self._columns}, f)
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self._staging, self.directory)
+        return ColumnarCache(self.directory)
+
+
+class ColumnarCache:
+    """Read side of a cache written by ColumnarCacheWriter; columns are memory-mapped"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.rows = meta['rows']
+        self._columns = meta['columns']
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str) -> np.ndarray:
+        """Column values, or int32 category codes for categorical columns"""
+        dtype = np.dtype(self._columns[name]['dtype'])
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.directory, f'{name}.bin'), dtype=dtype, mode='r', shape=(self.rows,))
+
+    def categories(self, name: str) -> Optional[List[str]]:
+        """Category values indexed by code, or None for non-categorical columns"""
+        return self._columns[name].get('categories')
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, 'meta.json'))
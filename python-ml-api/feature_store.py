@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+
+
+class FeatureStore:
+    """Encoded training matrices persisted as .npy files, one directory per key.
+
+    A key combines a digest of the source data with the feature-definition
+    version and column list, so editing the CSV or the feature code misses
+    the store instead of reusing stale features. Only the ``max_entries``
+    most recently written entries are kept.
+    """
+
+    def __init__(self, directory: str = 'feature_store', max_entries: int = 3):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    @staticmethod
+    def key(source_path: Optional[str], feature_version: int, feature_columns: List[str]) -> str:
+        """Store key for a source file, or for synthetic data when source_path is None"""
+        digest = hashlib.sha256()
+        if source_path is None:
+            digest.update(b'synthetic')
+        else:
+            with open(source_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        digest.update(f':{feature_version}:{",".join(feature_columns)}'.encode())
+        return digest.hexdigest()[:16]
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray, Dict[str, Any]]]:
+        """Memory-mapped features, target and fitted label encoders, or None on a miss"""
+        entry = os.path.join(self.directory, key)
+        if not os.path.exists(os.path.join(entry, 'meta.json')):
+            return None
+        # Copy-on-write so callers can scale in place without touching the stored files
+        X = np.load(os.path.join(entry, 'X.npy'), mmap_mode='c')
+        y = np.load(os.path.join(entry, 'y.npy'), mmap_mode='c')
+        return X, y, joblib.load(os.path.join(entry, 'label_encoders.pkl'))
+
+    def save(self, key: str, X: np.ndarray, y: np.ndarray, label_encoders: Dict[str, Any], source: str) -> None:
+        entry = os.path.join(self.directory, key)
+        staging = f'{entry}.tmp'
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        np.save(os.path.join(staging, 'X.npy'), X)
+        np.save(os.path.join(staging, 'y.npy'), y)
+        joblib.dump(label_encoders, os.path.join(staging, 'label_encoders.pkl'))
+        # meta.json marks the entry complete, so write it last
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump({'rows': int(X.shape[0]), 'columns': int(X.shape[1]), 'source': source}, f)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+        self._prune()
+
+    def _prune(self) -> None:
+        entries = [
+            os.path.join(self.directory, name) for name in os.listdir(self.directory)
+            if not name.endswith('.tmp')
+        ]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for stale in entries[self.max_entries:]:
+            shutil.rmtree(stale, ignore_errors=True)
@@ -0,0 +1,118 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+# Node arrays persisted as individual .npy files so np.load can memory-map them
+NODE_ARRAYS = ('feature', 'threshold', 'children_left', 'children_right', 'value', 'roots')
+
+
+class FlatForest:
+    """Structure-of-arrays copy of a fitted RandomForestRegressor.
+
+    All trees are concatenated into one set of node arrays. Leaves point to
+    themselves, so every row can be walked a fixed number of levels with
+    vectorized NumPy indexing. Loaded with ``mmap_mode='r'``, the arrays live
+    in the page cache and are shared by every process that maps the same files.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children_left: np.ndarray,
+                 children_right: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children_left = children_left
+        self.children_right = children_right
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.value)
+
+    @classmethod
+    def from_sklearn(cls, model) -> 'FlatForest':
+        """Flatten the fitted trees of a sklearn forest into contiguous arrays"""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+
+        features, thresholds, lefts, rights, values = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            # Leaves loop back to themselves and test feature 0 so extra levels are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(tree.threshold.astype(np.float64))
+            lefts.append((np.where(is_leaf, node_ids, tree.children_left) + offset).astype(np.int32))
+            rights.append((np.where(is_leaf, node_ids, tree.children_right) + offset).astype(np.int32))
+            values.append(tree.value[:, 0, 0].astype(np.float64))
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            children_left=np.concatenate(lefts),
+            children_right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=offsets.astype(np.int32),
+            max_depth=max(tree.max_depth for tree in trees)
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf node index reached in every tree, as an (n_samples, n_trees) matrix"""
+        # sklearn compares float32 inputs against float64 thresholds; do the same for identical splits
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        # Gather from the raveled input with precomputed row offsets instead of 2-D fancy indexing
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.int64) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_samples, self.n_trees))
+
+        for _ in range(self.max_depth):
+            go_left = flat_X[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+
+        return nodes
+
+    def predict_per_tree(self, X: np.ndarray) -> np.ndarray:
+        """Per-tree predictions as an (n_samples, n_trees) matrix"""
+        return self.value[self.apply(X)]
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """Forest prediction, the mean over trees"""
+        return self.predict_per_tree(X).mean(axis=1)
+
+    def matches(self, model, X: np.ndarray) -> bool:
+        """True if per-tree outputs on X are bit-identical to the sklearn forest they came from"""
+        leaves = model.apply(X)
+        expected = np.column_stack([
+            estimator.tree_.value[leaves[:, i], 0, 0] for i, estimator in enumerate(model.estimators_)
+        ])
+        return np.array_equal(self.predict_per_tree(X), expected)
+
+    def save(self, directory: str) -> None:
+        """Write each node array to its own uncompressed .npy file"""
+        os.makedirs(directory, exist_ok=True)
+        for name in NODE_ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'max_depth': int(self.max_depth), 'n_trees': self.n_trees, 'n_nodes': self.n_nodes}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r') -> 'FlatForest':
+        """Load a saved forest, memory-mapping the node arrays read-only by default"""
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode)
+            for name in NODE_ARRAYS
+        }
+        return cls(max_depth=meta['max_depth'], **arrays)
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, 'meta.json'))
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from price_history import PriceHistoryStore
+
+logger = logging.getLogger(__name__)
+
+QUEUE_POLICIES = ('drop_newest', 'drop_oldest', 'block')
+
+
+class HistoryWriter:
+    """Write-behind queue between scrapes and the price history store.
+
+    ``submit`` only appends to a bounded in-memory queue, so a search never
+    waits on SQLite. A background task writes the queue in batches of up to
+    ``batch_size`` rows, as soon as a batch is full or ``flush_interval``
+    seconds after the last write, on a worker thread. When the queue is full
+    the policy decides what is lost: ``drop_newest`` rejects incoming rows,
+    ``drop_oldest`` evicts queued ones, and ``block`` makes the search wait up
+    to ``block_timeout`` seconds in total for a flush before dropping. A batch whose
+    write fails is dropped and counted rather than retried. Must only be used
+    from one event loop.
+    """
+
+    def __init__(self, store: PriceHistoryStore, max_queue_size: int = 10_000, batch_size: int = 500,
+                 flush_interval: float = 1.0, policy: str = 'drop_newest', block_timeout: float = 0.1):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown history queue policy: {policy}")
+        self.store = store
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queue = deque()
+        self._batch_ready = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._flush_ms = deque(maxlen=1024)
+        self.enqueued = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.max_depth = 0
+
+    def start(self) -> None:
+        """Start the background writer on the running event loop"""
+        if self._task is None:
+            self._closing = False
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Write everything still queued, then stop the background writer"""
+        self._closing = True
+        self._batch_ready.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def submit(self, departure_date: str, flights: Iterable[Any]) -> int:
+        """Queue one search's FlightData records, returning how many were accepted"""
+        accepted = 0
+        # With 'block', one deadline covers the whole search rather than each row
+        deadline = time.monotonic() + self.block_timeout
+        for flight in flights:
+            if len(self._queue) >= self.max_queue_size:
+                if self.policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self.dropped += 1
+                elif not (self.policy == 'block' and await self._wait_for_space(deadline - time.monotonic())):
+                    self.dropped += 1
+                    continue
+            self._queue.append((departure_date, flight))
+            accepted += 1
+
+        self.enqueued += accepted
+        self.max_depth = max(self.max_depth, len(self._queue))
+        if len(self._queue) >= self.batch_size:
+            self._batch_ready.set()
+        return accepted
+
+    async def _wait_for_space(self, timeout: float) -> bool:
+        if timeout <= 0:
+            return False
+        self.blocked += 1
+        self._space_available.clear()
+        self._batch_ready.set()
+        try:
+            await asyncio.wait_for(self._space_available.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        # Another waiter may have refilled the queue first
+        return len(self._queue) < self.max_queue_size
+
+    async def _run(self) -> None:
+        while self._queue or not self._closing:
+            if len(self._queue) < self.batch_size and not self._closing:
+                self._batch_ready.clear()
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            if self._queue:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        self._space_available.set()
+
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.store.append_many, batch)
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Writing {len(batch)} price history rows failed: {str(e)}")
+        self._flush_ms.append((time.perf_counter() - started) * 1000)
+        self.flushes += 1
+
+    def stats(self) -> Dict[str, Any]:
+        latencies = np.array(self._flush_ms) if self._flush_ms else None
+        return {
+            'queue_depth': len(self._queue),
+            'max_queue_depth': self.max_depth,
+            'max_queue_size': self.max_queue_size,
+            'batch_size': self.batch_size,
+            'flush_interval_seconds': self.flush_interval,
+            'policy': self.policy,
+            'enqueued': self.enqueued,
+            'written': self.written,
+            'dropped': self.dropped,
+            'blocked': self.blocked,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'avg_batch_rows': round((self.written + self.failed) / self.flushes, 2) if self.flushes else 0.0,
+            # Over the most recent 1024 flushes
+            'flush_ms_p50': round(float(np.percentile(latencies, 50)), 2) if latencies is not None else None,
+            'flush_ms_p99': round(float(np.percentile(latencies, 99)), 2) if latencies is not None else None,
+            'flush_ms_max': round(float(latencies.max()), 2) if latencies is not None else None,
+            'running': self._task is not None and not self._task.done()
+        }
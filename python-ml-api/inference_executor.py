@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Model instance owned by each process-pool worker
+_worker_model = None
+
+
+class InferenceQueueFullError(Exception):
+    """Raised when an executor pool already has its maximum number of pending calls"""
+
+
+def _init_worker(model_dir: str, model_kwargs: Dict[str, Any], fallback_enabled: bool) -> None:
+    """Load a private model copy inside a process-pool worker"""
+    global _worker_model
+    from ml_model import FlightPriceMLModel
+
+    _worker_model = FlightPriceMLModel(**model_kwargs)
+    _worker_model.fallback_enabled = fallback_enabled
+    if not _worker_model.load_model(model_dir) and not fallback_enabled:
+        raise RuntimeError(f"Inference worker could not load model from {model_dir}")
+
+
+def _call_worker_model(method_name: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    return getattr(_worker_model, method_name)(*args, **kwargs)
+
+
+class _BoundedPool:
+    """Executor wrapper that rejects submissions beyond workers + queue depth"""
+
+    def __init__(self, name: str, executor: Executor, max_workers: int, max_queue_depth: int):
+        self.name = name
+        self.executor = executor
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def submit(self, fn: Callable, *args, **kwargs) -> Any:
+        # Only the event loop thread touches the counters, so no lock is needed
+        if self.pending >= self.max_workers + self.max_queue_depth:
+            self.rejected += 1
+            raise InferenceQueueFullError(
+                f"{self.name} pool is saturated ({self.pending} calls pending)"
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_workers': self.max_workers,
+            'max_queue_depth': self.max_queue_depth,
+            'pending': self.pending,
+            'queued': max(0, self.pending - self.max_workers),
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+
+
+class InferenceExecutor:
+    """Runs blocking model and scraper calls off the asyncio event loop.
+
+    Model calls go to a thread or process pool selected by ``mode``; other
+    blocking calls (scraping, file I/O) always go to a separate thread pool.
+    Each pool admits at most ``max_workers + max_queue_depth`` pending calls
+    and raises InferenceQueueFullError beyond that so callers can shed load.
+    """
+
+    def __init__(self, model, mode: str = 'thread', max_workers: Optional[int] = None,
+                 max_queue_depth: int = 64, io_workers: int = 16, model_dir: str = 'models',
+                 model_kwargs: Optional[Dict[str, Any]] = None, fallback_enabled: bool = False):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+
+        self.model = model
+        self.mode = mode
+        self.model_dir = model_dir
+        self.model_kwargs = model_kwargs or {}
+        self.fallback_enabled = fallback_enabled
+        workers = max_workers or min(4, os.cpu_count() or 1)
+
+        self._model_pool = _BoundedPool('inference', self._create_model_executor(workers), workers, max_queue_depth)
+        self._io_pool = _BoundedPool(
+            'io', ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix='blocking-io'),
+            io_workers, max_queue_depth
+        )
+        logger.info(f"Inference executor started in {mode} mode with {workers} workers")
+
+    def _create_model_executor(self, workers: int) -> Executor:
+        if self.mode == 'process':
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.model_dir, self.model_kwargs, self.fallback_enabled)
+            )
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+
+    def reload_workers(self) -> None:
+        """Start fresh process workers so they load the current artifact; a no-op in thread mode.
+
+        Calls already running finish on the old pool, new calls go to the new one.
+        """
+        if self.mode != 'process':
+            return
+        old_executor = self._model_pool.executor
+        self._model_pool.executor = self._create_model_executor(self._model_pool.max_workers)
+        old_executor.shutdown(wait=False)
+        logger.info("Inference workers restarted to pick up the new model")
+
+    def swap_model(self, model, model_dir: str) -> None:
+        """Serve a different model; calls already running finish on the one they started with"""
+        self.model = model
+        self.model_dir = model_dir
+        self.reload_workers()
+
+    async def run_model(self, method_name: str, *args, **kwargs) -> Any:
+        """Call a FlightPriceMLModel method on the inference pool"""
+        if self.mode == 'process':
+            return await self._model_pool.submit(_call_worker_model, method_name, args, kwargs)
+        return await self._model_pool.submit(getattr(self.model, method_name), *args, **kwargs)
+
+    async def run_blocking(self, fn: Callable, *args, **kwargs) -> Any:
+        """Call any blocking function on the I/O thread pool"""
+        return await self._io_pool.submit(fn, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'inference': self._model_pool.stats(),
+            'io': self._io_pool.stats()
+        }
+
+    def shutdown(self) -> None:
+        self._model_pool.executor.shutdown(wait=False, cancel_futures=True)
+        self._io_pool.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
@@ -7,8 +7,18 @@ import os
 from datetime import datetime
 import logging
 import asyncio
+import hashlib
+import hmac
+import json
+import threading
 
 from ml_model import FlightPriceMLModel
+from boosted_models import BOOSTED_BACKENDS
+from inference_executor import InferenceExecutor, InferenceQueueFullError
+from batching import PredictionBatcher
+from model_registry import ModelRegistry
+from history_writer import HistoryWriter
+from price_history import PriceHistoryStore, parse_departure_time, parse_duration_hours
 from realtime_scraper import RealTimeFlightScraper, FlightData
 
 # Configure logging
@@ -34,15 +44,253 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Every scraped price is appended to the history store (disabled when the path is empty)
+price_history_path = os.getenv("PRICE_HISTORY_PATH", "price_history.db")
+
 # Initialize ML model and scraper
-ml_model = FlightPriceMLModel()
-flight_scraper = RealTimeFlightScraper()
+model_kwargs = {
+    "trend_cache_size": int(os.getenv("TREND_CACHE_SIZE", "256")),
+    "trend_cache_ttl": float(os.getenv("TREND_CACHE_TTL_SECONDS", "3600")),
+    "mmap_model": os.getenv("MODEL_MMAP", "false").lower() == "true",
+    "inference_backend": os.getenv("INFERENCE_BACKEND", "auto"),
+    "flat_max_rows": int(os.getenv("INFERENCE_FLAT_MAX_ROWS", "64")),
+    "data_path": os.getenv("TRAINING_DATA_PATH", "../data/Indian Airlines.csv"),
+    "stream_chunk_size": int(os.getenv("TRAINING_STREAM_CHUNK_ROWS", "0")),
+    "data_cache_dir": os.getenv("TRAINING_CACHE_DIR", "data_cache"),
+    "feature_store_dir": os.getenv("FEATURE_STORE_DIR", "feature_store"),
+    "model_search": os.getenv("MODEL_SEARCH", "false").lower() == "true",
+    "search_folds": int(os.getenv("MODEL_SEARCH_FOLDS", "3")),
+    "search_workers": int(os.getenv("MODEL_SEARCH_WORKERS", "0")) or None,
+    "latency_weight": float(os.getenv("MODEL_SEARCH_LATENCY_WEIGHT", "5")),
+    "p99_budget_ms": float(os.getenv("MODEL_SEARCH_P99_BUDGET_MS", "0")) or None,
+    "model_backend": os.getenv("MODEL_BACKEND", "random_forest"),
+    "incremental_trees": int(os.getenv("INCREMENTAL_TREES", "10")),
+    "max_ensemble_size": int(os.getenv("MAX_ENSEMBLE_SIZE", "200")),
+    "min_update_samples": int(os.getenv("INCREMENTAL_MIN_SAMPLES", "50")),
+    "history_path": price_history_path or None,
+    "history_training_days": int(os.getenv("HISTORY_TRAINING_DAYS", "90"))
+}
+# Periodic warm-start updates from scraped prices (disabled when the interval is 0)
+incremental_update_interval = float(os.getenv("INCREMENTAL_UPDATE_INTERVAL_SECONDS", "0"))
+incremental_update_task = None
+if incremental_update_interval > 0 and model_kwargs["mmap_model"] and model_kwargs["model_backend"] not in BOOSTED_BACKENDS:
+    # A memory-mapped forest is read-only, so every update would fail
+    raise ValueError("INCREMENTAL_UPDATE_INTERVAL_SECONDS needs the pickled forest in memory; unset MODEL_MMAP to use it")
+ml_model = FlightPriceMLModel(**model_kwargs)
+# Scraped prices reach the history store through a bounded write-behind queue,
+# so searches never wait on the database
+price_history_store = PriceHistoryStore(price_history_path) if price_history_path else None
+history_writer = HistoryWriter(
+    price_history_store,
+    max_queue_size=int(os.getenv("HISTORY_QUEUE_SIZE", "10000")),
+    batch_size=int(os.getenv("HISTORY_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("HISTORY_FLUSH_INTERVAL_SECONDS", "1")),
+    policy=os.getenv("HISTORY_QUEUE_POLICY", "drop_newest"),
+    block_timeout=float(os.getenv("HISTORY_QUEUE_BLOCK_MS", "100")) / 1000
+) if price_history_store else None
+flight_scraper = RealTimeFlightScraper(
+    source_timeout=float(os.getenv("SEARCH_SOURCE_TIMEOUT_SECONDS", "10")),
+    search_deadline=float(os.getenv("SEARCH_DEADLINE_SECONDS", "20")),
+    requests_per_second=float(os.getenv("SCRAPER_REQUESTS_PER_SECOND", "0.5")),
+    burst=float(os.getenv("SCRAPER_BURST", "1")),
+    max_connections_per_host=int(os.getenv("SCRAPER_MAX_CONNECTIONS_PER_HOST", "4")),
+    cache_ttl=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60")),
+    cache_stale_ttl=float(os.getenv("SEARCH_CACHE_STALE_SECONDS", "0")),
+    cache_swr_min_hits=int(os.getenv("SEARCH_CACHE_SWR_MIN_HITS", "3")),
+    cache_size=int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+    cache_incomplete_ttl=float(os.getenv("SEARCH_CACHE_INCOMPLETE_TTL_SECONDS", "5")),
+    history_store=price_history_store,
+    history_writer=history_writer
+)
+
+# Every model the service trains or updates is published as a registry version;
+# CURRENT names the one being served
+model_registry = ModelRegistry(
+    os.getenv("MODEL_REGISTRY_DIR", "model_registry"),
+    max_versions=int(os.getenv("MODEL_REGISTRY_MAX_VERSIONS", "5"))
+)
+active_version = model_registry.current()
+# A candidate is rejected when its holdout MAE is worse than the served model's by more than this fraction
+max_mae_regression = float(os.getenv("MODEL_RELOAD_MAX_MAE_REGRESSION", "0.05"))
+rejected_versions = set()
+# Serializes swaps, reloads and incremental updates of the served model
+model_swap_lock = threading.Lock()
+
+# Load the active version, or the legacy models/ directory. Without either, "blocking" startup
+# trains before serving, while "background" startup serves the rule-based fallback until training finishes
+model_startup_mode = os.getenv("MODEL_STARTUP_MODE", "background")
+needs_background_training = False
+if not ml_model.load_model(model_registry.path(active_version) if active_version else "models"):
+    if model_startup_mode == "blocking":
+        logger.info("No existing model found. Training new model...")
+        ml_model.train_model()
+        ml_model.save_model()
+    else:
+        logger.info("No existing model found. Serving fallback predictions while training in the background...")
+        ml_model.fallback_enabled = True
+        needs_background_training = True
+if ml_model.model is not None and active_version is None:
+    # Every worker starting on an empty registry gets here, but only the first
+    # publishes; the others keep serving the model they loaded or trained
+    active_version = model_registry.publish(ml_model, "startup", first_only=True)
+    if active_version is not None:
+        model_registry.activate(active_version)
+# Served by /available-cities while the rule-based fallback serves, e.g. during background training
+fallback_city_index = FlightPriceMLModel.fallback_city_index() if ml_model.city_index is None else None
+# Newest version already published here or considered, so the registry watcher
+# only reacts to new versions and never undoes an explicit rollback
+newest_handled_version = active_version
+
+# Blocking model and scraper calls run here so they never stall the event loop
+inference_executor = InferenceExecutor(
+    ml_model,
+    mode=os.getenv("INFERENCE_EXECUTOR_MODE", "thread"),
+    max_workers=int(os.getenv("INFERENCE_WORKERS", "0")) or None,
+    max_queue_depth=int(os.getenv("INFERENCE_MAX_QUEUE", "64")),
+    model_dir=model_registry.path(active_version) if active_version else "models",
+    model_kwargs=model_kwargs,
+    fallback_enabled=ml_model.fallback_enabled
+)
+
+# Optional micro-batching of concurrent /predict calls (disabled when the window is 0)
+predict_batch_window_ms = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "0"))
+prediction_batcher = PredictionBatcher(
+    inference_executor,
+    max_batch_size=int(os.getenv("PREDICT_MAX_BATCH_SIZE", "32")),
+    max_wait_ms=predict_batch_window_ms
+) if predict_batch_window_ms > 0 else None
+
+def publish_served_model(source: str) -> str:
+    """Save the served model as a new registry version, activate it and point the workers at it"""
+    global active_version, newest_handled_version
+    version = model_registry.publish(ml_model, source)
+    model_registry.activate(version)
+    active_version = newest_handled_version = version
+    inference_executor.swap_model(ml_model, model_registry.path(version))
+    return version
+
+def on_background_training_complete():
+    with model_swap_lock:
+        publish_served_model("training")
+
+def apply_incremental_update() -> Optional[Dict[str, Any]]:
+    """Grow the model on buffered observations and publish it as a new version.
+    
+    Like a reload, the grown model must stay within max_mae_regression of the
+    served model's holdout MAE, or the served model is kept.
+    """
+    with model_swap_lock:
+        holdout = FlightPriceMLModel.load_holdout(model_registry.holdout_path)
+        if holdout is None:
+            holdout = ml_model.holdout
+        summary = ml_model.update_incrementally(holdout, max_mae_regression)
+        if summary is not None and not summary.get('rejected'):
+            summary['version'] = publish_served_model("incremental")
+    return summary
+
+def load_model_version(version: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    """Load a registry version (the newest by default), benchmark it and swap it in.
+
+    The candidate is loaded beside the served model. It is swapped in only if its
+    holdout MAE is within max_mae_regression of the served model's, unless forced.
+    The swap replaces one reference, so calls already running finish on the old model.
+    """
+    global ml_model, active_version, newest_handled_version
+    with model_swap_lock:
+        version = version or model_registry.latest()
+        if version not in model_registry.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        newest_handled_version = max(version, newest_handled_version or version)
+        candidate = FlightPriceMLModel(**model_kwargs)
+        if not candidate.load_model(model_registry.path(version)):
+            raise ValueError(f"Model version {version} could not be loaded")
+        
+        result = {'version': version, 'previous_version': active_version, 'swapped': False}
+        holdout = FlightPriceMLModel.load_holdout(model_registry.holdout_path)
+        if holdout is not None:
+            result['candidate_holdout'] = candidate.evaluate_holdout(holdout)
+            if ml_model.model is not None:
+                result['served_holdout'] = ml_model.evaluate_holdout(holdout)
+                limit = result['served_holdout']['mae'] * (1 + max_mae_regression)
+                if not force and result['candidate_holdout']['mae'] > limit:
+                    rejected_versions.add(version)
+                    result['reason'] = f"holdout MAE {result['candidate_holdout']['mae']:.2f} is above {limit:.2f}"
+                    logger.warning(f"Rejected model {version}: {result['reason']}")
+                    return result
+        
+        # Buffered observations follow the served model; its trend cache starts empty
+        previous = ml_model
+        candidate.add_observations(previous.take_observations())
+        ml_model = candidate
+        inference_executor.swap_model(candidate, model_registry.path(version))
+        model_registry.activate(version)
+        active_version = version
+        rejected_versions.discard(version)
+        previous.trend_cache.clear()
+        
+        result['swapped'] = True
+        logger.info(f"Now serving model {version} (was {result['previous_version']})")
+        return result
+
+# Optional polling for versions published by other processes, e.g. an offline training job
+model_registry_poll_interval = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", "0"))
+model_registry_watch_task = None
 
-# Load existing model or train new one
-if not ml_model.load_model():
-    logger.info("No existing model found. Training new model...")
-    ml_model.train_model()
-    ml_model.save_model()
+async def watch_model_registry():
+    while True:
+        await asyncio.sleep(model_registry_poll_interval)
+        latest = model_registry.latest()
+        if latest is None or (newest_handled_version is not None and latest <= newest_handled_version):
+            continue
+        try:
+            await inference_executor.run_blocking(load_model_version, latest)
+        except InferenceQueueFullError:
+            continue
+        except Exception as e:
+            rejected_versions.add(latest)
+            logger.error(f"Loading model {latest} failed: {str(e)}")
+
+async def run_incremental_updates():
+    while True:
+        await asyncio.sleep(incremental_update_interval)
+        try:
+            await inference_executor.run_blocking(apply_incremental_update)
+        except Exception as e:
+            logger.error(f"Incremental model update failed: {str(e)}")
+
+@app.on_event("startup")
+async def start_background_training():
+    global incremental_update_task, model_registry_watch_task
+    if needs_background_training:
+        ml_model.train_in_background(on_complete=on_background_training_complete)
+    if incremental_update_interval > 0:
+        incremental_update_task = asyncio.create_task(run_incremental_updates())
+    if model_registry_poll_interval > 0:
+        model_registry_watch_task = asyncio.create_task(watch_model_registry())
+    if history_writer:
+        history_writer.start()
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    for task in (incremental_update_task, model_registry_watch_task):
+        if task:
+            task.cancel()
+    inference_executor.shutdown()
+    if history_writer:
+        await history_writer.close()
+    await flight_scraper.close()
+
+def overloaded_exception(error: InferenceQueueFullError) -> HTTPException:
+    """503 returned when the executor sheds load"""
+    logger.warning(f"Shedding request: {str(error)}")
+    return HTTPException(status_code=503, detail="Server busy, please retry shortly", headers={"Retry-After": "1"})
+
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+admin_token = os.getenv("ADMIN_TOKEN", "")
+
+def check_admin_token(token: Optional[str]) -> None:
+    if not admin_token or not hmac.compare_digest(token or "", admin_token):
+        raise HTTPException(status_code=403, detail="Admin token missing or invalid")
 
 class FlightPredictionRequest(BaseModel):
     airline: str
@@ -50,7 +298,7 @@ class FlightPredictionRequest(BaseModel):
     destination_city: str
     departure_date: str  # YYYY-MM-DD format
     departure_time: Optional[str] = "10:00"  # HH:MM format
-    journey_duration_hours: Optional[float] = 2.5
+    journey_duration_hours: Optional[float] = None  # the route's typical duration when omitted
     total_stops: Optional[int] = 0
     travel_class: Optional[str] = "economy"
 
@@ -95,22 +343,43 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    ready = ml_model.model is not None
     return {
-        "status": "healthy",
-        "model_loaded": ml_model.model is not None,
+        "status": "healthy" if ready else "degraded",
+        "ready": ready,
+        "model_loaded": ready,
+        "model_state": ml_model.state,
+        "model_version": active_version,
+        "serving_fallback": not ready and ml_model.fallback_enabled,
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """Hit/miss counters for the in-process caches"""
+    return {
+        "success": True,
+        "trend_cache": ml_model.trend_cache.stats(),
+        "search_cache": flight_scraper.search_cache.stats(),
+        "executor": inference_executor.stats(),
+        "predict_batcher": prediction_batcher.stats() if prediction_batcher else None,
+        "scraper_rate_limits": flight_scraper.rate_limit_stats(),
+        "history_writer": history_writer.stats() if history_writer else None
+    }
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict_flight_price(request: FlightPredictionRequest):
     try:
         logger.info(f"Prediction request: {request.dict()}")
         
         # Convert request to model parameters
-        flight_params = request.dict()
+        flight_params = prediction_params(request)
         
         # Get ML prediction
-        prediction_result = ml_model.predict_price(flight_params)
+        if prediction_batcher:
+            prediction_result = await prediction_batcher.predict(flight_params)
+        else:
+            prediction_result = await inference_executor.run_model("predict_price", flight_params)
         
         # Generate recommendation based on prediction
         recommendation = generate_recommendation(
@@ -138,6 +407,8 @@ async def predict_flight_price(request: FlightPredictionRequest):
         logger.info(f"Prediction successful: ₹{prediction_result['predicted_price']}")
         return response
         
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
@@ -146,15 +417,16 @@ async def predict_flight_price(request: FlightPredictionRequest):
 async def batch_predict_prices(requests: list[FlightPredictionRequest]):
     """Predict prices for multiple flights"""
     try:
-        results = []
-        for request in requests:
-            flight_params = request.dict()
-            prediction_result = ml_model.predict_price(flight_params)
-            
-            results.append({
+        flight_params_list = [prediction_params(request) for request in requests]
+        predictions = await inference_executor.run_model("predict_prices", flight_params_list)
+        
+        results = [
+            {
                 "request": flight_params,
                 "prediction": prediction_result
-            })
+            }
+            for flight_params, prediction_result in zip(flight_params_list, predictions)
+        ]
         
         return {
             "success": True,
@@ -162,6 +434,8 @@ async def batch_predict_prices(requests: list[FlightPredictionRequest]):
             "count": len(results)
         }
         
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Batch prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
@@ -174,7 +448,7 @@ async def search_realtime_flights(request: FlightSearchRequest):
         logger.info(f"Real-time flight search: {request.origin} -> {request.destination} on {request.departure_date}")
         
         # Search flights from real-time sources
-        flights = flight_scraper.search_flights(
+        flights = await flight_scraper.search_flights_async(
             origin=request.origin,
             destination=request.destination,
             departure_date=request.departure_date,
@@ -216,6 +490,8 @@ async def search_realtime_flights(request: FlightSearchRequest):
         logger.info(f"Found {len(flights)} flights from {len(sources)} sources in {search_time:.2f}s")
         return response
         
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Real-time flight search error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Flight search failed: {str(e)}")
@@ -226,68 +502,92 @@ async def compare_flights_with_ml(request: FlightSearchRequest):
     try:
         logger.info(f"Flight comparison with ML: {request.origin} -> {request.destination}")
         
+        # Route aggregates from the catalog, read before a fresh scrape adds today's prices to it
+        route_stats = ml_model.route_catalog.summary(request.origin, request.destination)
+        
         # Get real-time flight data
-        realtime_flights = flight_scraper.search_flights(
+        realtime_flights = await flight_scraper.search_flights_async(
             origin=request.origin,
             destination=request.destination,
             departure_date=request.departure_date,
             return_date=request.return_date
         )
         
-        # Get historical data for context
-        historical_data = flight_scraper.get_historical_prices(
-            origin=request.origin,
-            destination=request.destination,
-            days_back=30
-        )
+        # Stored history only for routes the catalog has never seen
+        if route_stats is not None:
+            avg_historical = route_stats['avg_price']
+        else:
+            historical_data = await inference_executor.run_blocking(
+                flight_scraper.get_historical_prices,
+                origin=request.origin,
+                destination=request.destination,
+                days_back=30
+            )
+            recent_prices = [h['price'] for h in historical_data[-7:]]
+            avg_historical = sum(recent_prices) / len(recent_prices) if recent_prices else None
+        typical_duration = ml_model.route_catalog.typical_duration(request.origin, request.destination)
+        
+        # Apply ML predictions to all flights in one batch
+        flight_params_list = [
+            {
+                'airline': flight.airline,
+                'source_city': request.origin,
+                'destination_city': request.destination,
+                'departure_date': request.departure_date,
+                'departure_time': parse_departure_time(flight.departure_time),
+                'journey_duration_hours': parse_duration_hours(flight.duration, typical_duration),
+                'total_stops': flight.stops,
+                'travel_class': request.travel_class
+            }
+            for flight in realtime_flights
+        ]
         
-        # Apply ML predictions to each flight
         ml_predictions = []
-        for flight in realtime_flights:
-            try:
-                flight_params = {
-                    'airline': flight.airline,
-                    'source_city': request.origin,
-                    'destination_city': request.destination,
-                    'departure_date': request.departure_date,
-                    'departure_time': flight.departure_time.split()[-1] if ' ' in flight.departure_time else '10:00',
-                    'journey_duration_hours': 2.5,  # Default duration
-                    'total_stops': flight.stops,
-                    'travel_class': request.travel_class
-                }
-                
-                prediction_result = ml_model.predict_price(flight_params)
-                
-                ml_prediction = {
-                    'flight_id': flight.id,
-                    'actual_price': flight.price,
-                    'predicted_price': prediction_result['predicted_price'],
-                    'confidence': prediction_result['confidence'],
-                    'price_difference': flight.price - prediction_result['predicted_price'],
-                    'percentage_difference': ((flight.price - prediction_result['predicted_price']) / flight.price) * 100,
-                    'recommendation': generate_comparison_recommendation(flight.price, prediction_result['predicted_price'], prediction_result['confidence'])
-                }
-                
-                ml_predictions.append(ml_prediction)
-                
-            except Exception as e:
-                logger.warning(f"ML prediction failed for flight {flight.id}: {str(e)}")
+        try:
+            prediction_results = await inference_executor.run_model("predict_prices", flight_params_list)
+        except InferenceQueueFullError:
+            raise
+        except Exception as e:
+            # One bad row must not cost every flight its prediction, so retry row by row
+            logger.warning(f"Batched ML prediction of {len(flight_params_list)} flights failed, retrying individually: {str(e)}")
+            prediction_results = await asyncio.gather(
+                *[inference_executor.run_model("predict_price", params) for params in flight_params_list],
+                return_exceptions=True
+            )
+        
+        for flight, prediction_result in zip(realtime_flights, prediction_results):
+            if isinstance(prediction_result, InferenceQueueFullError):
+                raise prediction_result
+            if isinstance(prediction_result, Exception):
+                logger.warning(f"ML prediction failed for flight {flight.id}: {str(prediction_result)}")
                 continue
+            ml_prediction = {
+                'flight_id': flight.id,
+                'actual_price': flight.price,
+                'predicted_price': prediction_result['predicted_price'],
+                'confidence': prediction_result['confidence'],
+                'price_difference': flight.price - prediction_result['predicted_price'],
+                'percentage_difference': ((flight.price - prediction_result['predicted_price']) / flight.price) * 100,
+                'recommendation': generate_comparison_recommendation(flight.price, prediction_result['predicted_price'], prediction_result['confidence'])
+            }
+            
+            ml_predictions.append(ml_prediction)
         
         # Analyze price patterns
-        if historical_data and realtime_flights:
-            avg_historical = sum(h['price'] for h in historical_data[-7:]) / min(7, len(historical_data))
-            avg_current = sum(f.price for f in realtime_flights) / len(realtime_flights)
+        if avg_historical and realtime_flights:
+            current_prices = [f.price for f in realtime_flights]
+            avg_current = sum(current_prices) / len(current_prices)
             
             price_analysis = {
                 'avg_historical_price': int(avg_historical),
                 'avg_current_price': int(avg_current),
                 'price_trend': 'increasing' if avg_current > avg_historical * 1.05 else 'decreasing' if avg_current < avg_historical * 0.95 else 'stable',
-                'best_deal_flight_id': min(realtime_flights, key=lambda f: f.price).id if realtime_flights else None,
+                'best_deal_flight_id': min(realtime_flights, key=lambda f: f.price).id,
                 'price_range': {
-                    'min': min(f.price for f in realtime_flights),
-                    'max': max(f.price for f in realtime_flights)
-                } if realtime_flights else {'min': 0, 'max': 0}
+                    'min': min(current_prices),
+                    'max': max(current_prices)
+                },
+                'route_statistics': route_stats
             }
         else:
             price_analysis = {
@@ -328,10 +628,39 @@ async def compare_flights_with_ml(request: FlightSearchRequest):
         logger.info(f"Flight comparison completed: {len(realtime_flights)} flights analyzed")
         return response
         
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Flight comparison error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Flight comparison failed: {str(e)}")
 
+class ModelReloadRequest(BaseModel):
+    version: Optional[str] = None  # newest published version when omitted
+    force: Optional[bool] = False  # swap even if the holdout benchmark regresses
+
+@app.get("/admin/models")
+async def list_model_versions(x_admin_token: Optional[str] = Header(None)):
+    """Published model versions and the one being served"""
+    check_admin_token(x_admin_token)
+    return {
+        "success": True,
+        "active_version": active_version,
+        "versions": [model_registry.describe(version) for version in model_registry.versions()],
+        "rejected_versions": sorted(rejected_versions)
+    }
+
+@app.post("/admin/models/reload")
+async def reload_model(request: ModelReloadRequest, x_admin_token: Optional[str] = Header(None)):
+    """Load a model version in the background, benchmark it on the holdout and swap it in"""
+    check_admin_token(x_admin_token)
+    try:
+        result = await inference_executor.run_blocking(load_model_version, request.version, request.force)
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": result['swapped'], **result}
+
 class PriceTrendRequest(BaseModel):
     source_city: str
     destination_city: str
@@ -354,7 +683,8 @@ async def get_price_trend(request: PriceTrendRequest):
     try:
         logger.info(f"Getting price trend for {request.source_city} -> {request.destination_city}")
         
-        trends = ml_model.get_price_trend(
+        trends = await inference_executor.run_model(
+            "get_price_trend",
             request.source_city,
             request.destination_city,
             request.days_ahead or 30
@@ -371,6 +701,8 @@ async def get_price_trend(request: PriceTrendRequest):
             }
         }
     
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Price trend failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Price trend analysis failed: {str(e)}")
@@ -381,7 +713,7 @@ async def get_price_trend_get(source_city: str, destination_city: str, days_ahea
     try:
         logger.info(f"Getting price trend (GET) for {source_city} -> {destination_city}")
 
-        trends = ml_model.get_price_trend(source_city, destination_city, days_ahead or 30)
+        trends = await inference_executor.run_model("get_price_trend", source_city, destination_city, days_ahead or 30)
 
         return {
             "success": True,
@@ -393,6 +725,8 @@ async def get_price_trend_get(source_city: str, destination_city: str, days_ahea
                 "avg_price": sum(t['predicted_price'] for t in trends) / len(trends) if trends else 0
             }
         }
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Price trend (GET) failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Price trend analysis failed: {str(e)}")
@@ -403,11 +737,13 @@ async def analyze_current_price(request: PriceAnalysisRequest):
     try:
         logger.info(f"Analyzing price {request.current_price} for {request.source_city} -> {request.destination_city}")
         
-        analysis = ml_model.analyze_price_vs_current(
+        analysis = await inference_executor.run_model(
+            "analyze_price_vs_current",
             request.current_price,
             request.source_city,
             request.destination_city,
-            request.departure_date
+            request.departure_date,
+            route_stats=ml_model.route_catalog.summary(request.source_city, request.destination_city)
         )
         
         return {
@@ -416,59 +752,122 @@ async def analyze_current_price(request: PriceAnalysisRequest):
             "analysis": analysis
         }
     
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Price analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Price analysis failed: {str(e)}")
 
+# Serialized /available-cities body and its ETag, keyed by the city index they were built from
+cities_response = None
+
 @app.get("/available-cities")
-async def get_available_cities():
+async def get_available_cities(if_none_match: Optional[str] = Header(None)):
     """Get list of cities available in the ML model"""
-    try:
-        # Load real data to get available cities
-        df = ml_model.load_real_data()
-        
-        source_cities = sorted(df['source_city'].unique().tolist()) if not df.empty else []
-        dest_cities = sorted(df['destination_city'].unique().tolist()) if not df.empty else []
-        
-        # Get combined unique cities
-        all_cities = sorted(list(set(source_cities + dest_cities)))
-        
-        return {
+    global cities_response
+    city_index = ml_model.city_index or fallback_city_index
+    
+    # Training and model swaps install a new index object, which rebuilds the body
+    if cities_response is None or cities_response[0] is not city_index:
+        body = json.dumps({
             "success": True,
-            "cities": all_cities,
-            "total_cities": len(all_cities)
-        }
+            "cities": city_index['cities'],
+            "total_cities": len(city_index['cities']),
+            "routes": city_index['routes']
+        }).encode()
+        cities_response = (city_index, body, f'"{hashlib.sha256(body).hexdigest()[:16]}"')
     
-    except Exception as e:
-        logger.error(f"Get cities failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to get available cities: {str(e)}")
+    _, body, etag = cities_response
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/historical-prices/{origin}/{destination}")
 async def get_historical_prices(origin: str, destination: str, days_back: int = 30):
     """Get historical price data for a route"""
     try:
-        historical_data = flight_scraper.get_historical_prices(
+        # Indexed range query on the history store, off the event loop
+        historical_data = await inference_executor.run_blocking(
+            flight_scraper.get_historical_prices,
             origin=origin,
             destination=destination,
             days_back=days_back
         )
         
+        # Precomputed route aggregates; a single pass over the points only for routes the catalog lacks
+        route_stats = ml_model.route_catalog.summary(origin, destination)
+        if route_stats is not None:
+            price_summary = {key: route_stats[key] for key in ('avg_price', 'min_price', 'max_price')}
+        else:
+            prices = [d['price'] for d in historical_data]
+            price_summary = {
+                'avg_price': int(sum(prices) / len(prices)) if prices else 0,
+                'min_price': min(prices, default=0),
+                'max_price': max(prices, default=0)
+            }
+        
         return {
             'success': True,
             'route': f"{origin} -> {destination}",
             'data_points': len(historical_data),
             'historical_data': historical_data,
-            'price_summary': {
-                'avg_price': int(sum(d['price'] for d in historical_data) / len(historical_data)) if historical_data else 0,
-                'min_price': min(d['price'] for d in historical_data) if historical_data else 0,
-                'max_price': max(d['price'] for d in historical_data) if historical_data else 0
-            }
+            'price_summary': price_summary,
+            'route_statistics': route_stats
         }
         
+    except InferenceQueueFullError as e:
+        raise overloaded_exception(e)
     except Exception as e:
         logger.error(f"Historical prices error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get historical prices: {str(e)}")
 
+def prediction_params(request: FlightPredictionRequest) -> Dict[str, Any]:
+    """Model parameters for a prediction request, defaulting the duration to the route's typical one"""
+    params = request.dict()
+    if params['journey_duration_hours'] is None:
+        params['journey_duration_hours'] = ml_model.route_catalog.typical_duration(
+            request.source_city, request.destination_city
+        )
+    return params
+
+def record_observations(origin: str, destination: str, departure_date: str, flights: List[FlightData]) -> None:
+    """Feed freshly scraped prices to the route catalog and, when enabled, the incremental-update buffer.
+    
+    The scraper calls this once per scrape rather than once per request, so cached results are not
+    counted again. Only routes between cities the model knows are recorded, so arbitrary request
+    strings cannot grow the catalog.
+    """
+    city_index = ml_model.city_index
+    if not city_index or origin not in city_index['cities'] or destination not in city_index['cities']:
+        return
+    observations = flight_observations(origin, destination, departure_date, flights)
+    ml_model.route_catalog.add_records(observations)
+    if incremental_update_interval > 0:
+        ml_model.add_observations(observations)
+
+flight_scraper.on_results = record_observations
+
+def flight_observations(origin: str, destination: str, departure_date: str,
+                        flights: List[FlightData]) -> List[Dict[str, Any]]:
+    """Scraped flights as model inputs plus their observed price"""
+    typical_duration = ml_model.route_catalog.typical_duration(origin, destination)
+    return [
+        {
+            'airline': flight.airline,
+            'source_city': origin,
+            'destination_city': destination,
+            'departure_date': departure_date,
+            'departure_time': parse_departure_time(flight.departure_time),
+            'journey_duration_hours': parse_duration_hours(flight.duration, typical_duration),
+            'total_stops': flight.stops,
+            'price': flight.price
+        }
+        for flight in flights
+        if flight.price > 0
+    ]
+
 def generate_comparison_recommendation(actual_price: int, predicted_price: int, confidence: float) -> str:
     """Generate recommendation based on price comparison"""
     difference = actual_price - predicted_price
@@ -1,19 +1,139 @@
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
 import joblib
+import copy
+import itertools
+import json
+import math
 import os
-from datetime import datetime, timedelta
+import shutil
+import threading
+from collections import deque
+from datetime import datetime
 import warnings
+
+from caching import TTLLRUCache
+from columnar_cache import ColumnarCacheWriter
+from feature_store import FeatureStore
+from boosted_models import BOOSTED_BACKENDS, QuantileBoostedModel
+from flat_forest import FlatForest
+from price_history import PriceHistoryStore, parse_departure_time, parse_duration_hours
+from model_selection import make_estimator, run_search
+from route_catalog import RouteCatalog, price_percentile
 warnings.filterwarnings('ignore')
 
+# Routes treated as popular when scoring requests
+INFERENCE_POPULAR_ROUTES = [('Delhi', 'Mumbai'), ('Mumbai', 'Bangalore'), ('Delhi', 'Bangalore')]
+INFERENCE_POPULAR_ROUTE_SET = frozenset(
+    INFERENCE_POPULAR_ROUTES + [(destination, source) for source, destination in INFERENCE_POPULAR_ROUTES]
+)
+HOLIDAY_MONTHS = [12, 1, 4, 5, 10]
+AIRLINE_PRICE_MULTIPLIERS = {
+    'IndiGo': 1.0, 'SpiceJet': 0.9, 'Air India': 1.2,
+    'Vistara': 1.3, 'AirAsia India': 0.85, 'Akasa Air': 0.95
+}
+SYNTHETIC_AIRLINES = ['IndiGo', 'SpiceJet', 'Air India', 'Vistara', 'AirAsia India', 'Akasa Air']
+SYNTHETIC_CITIES = ['Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Hyderabad',
+                    'Pune', 'Ahmedabad', 'Kochi', 'Goa', 'Jaipur', 'Lucknow']
+SYNTHETIC_POPULAR_ROUTES = [('Delhi', 'Mumbai'), ('Mumbai', 'Bangalore'), ('Delhi', 'Bangalore'),
+                            ('Chennai', 'Mumbai'), ('Delhi', 'Chennai'), ('Mumbai', 'Chennai')]
+# Major routes in the historical dataset, listed in both directions
+TRAINING_POPULAR_ROUTES = [
+    route
+    for source, destination in [('Delhi', 'Mumbai'), ('Mumbai', 'Bangalore'), ('Delhi', 'Bangalore'),
+                                ('Chennai', 'Mumbai'), ('Delhi', 'Chennai'), ('Mumbai', 'Chennai'),
+                                ('Kolkata', 'Mumbai'), ('Hyderabad', 'Mumbai'), ('Delhi', 'Kolkata')]
+    for route in [(source, destination), (destination, source)]
+]
+DEPARTURE_TIME_HOURS = {
+    'Early_Morning': 6, 'Morning': 9, 'Afternoon': 14,
+    'Evening': 18, 'Night': 21, 'Late_Night': 23
+}
+STOPS_MAP = {'zero': 0, 'one': 1, 'two': 2}
+# Historical records carry no departure date; features are derived from this fixed day
+REAL_DATA_BASE_DATE = datetime(2024, 6, 15)
+# Low-cardinality string columns are read as categoricals
+REAL_DATA_DTYPES = {
+    'airline': 'category', 'source_city': 'category', 'destination_city': 'category',
+    'departure_time': 'category', 'stops': 'category'
+}
+REAL_DATA_COLUMNS = list(REAL_DATA_DTYPES) + ['duration', 'days_left', 'price']
+# Hyperparameters for each backend when no hyperparameter search is run
+DEFAULT_MODEL_PARAMS = {
+    'random_forest': {'n_estimators': 100, 'max_depth': 20},
+    'extra_trees': {'n_estimators': 100, 'max_depth': 20},
+    'xgboost': {'n_estimators': 300, 'max_depth': 6, 'learning_rate': 0.1, 'tree_method': 'hist'},
+    'hist_gb': {'max_iter': 300, 'max_depth': 6, 'learning_rate': 0.1},
+}
+# Bump whenever feature derivation or encoding changes so feature store entries are rebuilt
+FEATURE_VERSION = 2
+# Code given to airlines and cities the encoders never saw during training
+UNKNOWN_CATEGORY_CODE = -1
+# Relative spread reported by the rule-based fallback used while no model is loaded
+FALLBACK_RELATIVE_STD = 0.25
+# Test-split rows kept with each trained model as its holdout benchmark
+HOLDOUT_ROWS = 5000
+
 class FlightPriceMLModel:
-    def __init__(self):
-        self.model = None
+    def __init__(self, trend_cache_size=256, trend_cache_ttl=3600, mmap_model=False,
+                 inference_backend='sklearn', flat_max_rows=64, data_path="../data/Indian Airlines.csv",
+                 stream_chunk_size=0, data_cache_dir='data_cache', feature_store_dir=None,
+                 model_search=False, search_folds=3, search_workers=None, latency_weight=5.0,
+                 p99_budget_ms=None, model_backend='random_forest', incremental_trees=10,
+                 max_ensemble_size=200, min_update_samples=50, observation_buffer_size=100_000,
+                 history_path=None, history_training_days=90):
+        # (model, leaf table, compiled forest, generation), replaced as one tuple so readers never
+        # mix versions; the generation changes with every publish and keys derived caches
+        self._generations = itertools.count(1)
+        self._serving = (None, None, None, 0)
+        # (FlatForest, pickle it was exported from) for a memory-mapped load, so saves keep the pickle
+        self._flat_source = (None, None)
+        # Incremental updates add incremental_trees trees (or boosting rounds) per observation window
+        self.incremental_trees = incremental_trees
+        self.max_ensemble_size = max_ensemble_size
+        self.min_update_samples = min_update_samples
+        self._observations = deque(maxlen=observation_buffer_size)
+        self._observations_lock = threading.Lock()
+        # Scraped prices stored in the last history_training_days days are added to every full training run
+        self.history_path = history_path
+        self.history_training_days = history_training_days
+        # Model family trained without a search: a forest, or a quantile boosted backend
+        if model_backend not in DEFAULT_MODEL_PARAMS:
+            raise ValueError(f"Unknown model backend: {model_backend}")
+        self.model_backend = model_backend
+        # Hyperparameter search settings; latency_weight is rupees of MAE traded per ms of p99 latency
+        self.model_search = model_search
+        self.search_folds = search_folds
+        self.search_workers = search_workers
+        self.latency_weight = latency_weight
+        self.p99_budget_ms = p99_budget_ms
+        self.search_results = None
+        # Test-split feature values and prices, saved with the model for benchmarking new versions
+        self.holdout = None
+        # Cities and trained routes by name, built at train time and saved beside the encoders
+        self.city_index = None
+        # Per-route price aggregates from the training data, updated with observed prices
+        self.route_catalog = RouteCatalog()
+        self.data_path = data_path
+        # With a chunk size, training streams the CSV through an on-disk columnar cache
+        self.stream_chunk_size = stream_chunk_size
+        self.data_cache_dir = data_cache_dir
+        self.feature_store = FeatureStore(feature_store_dir) if feature_store_dir else None
+        self.mmap_model = mmap_model
+        # 'sklearn', 'flat', or 'auto' (flat arrays for batches up to flat_max_rows)
+        self.inference_backend = inference_backend
+        self.flat_max_rows = flat_max_rows
+        self.state = 'untrained'
+        self.fallback_enabled = False
+        self.interval_quantiles = (0.1, 0.9)
+        self.max_trend_days = 365
+        self.trend_cache = TTLLRUCache(max_size=trend_cache_size, ttl_seconds=trend_cache_ttl)
         self.label_encoders = {}
+        # Lookup tables derived from label_encoders once per fit/load; the scoring path reads only these
+        self.category_codes = {}
         self.scaler = StandardScaler()
         self.feature_columns = [
             'airline_encoded', 'source_city_encoded', 'destination_city_encoded',
@@ -23,173 +143,152 @@ class FlightPriceMLModel:
         ]
         
     def load_real_data(self, csv_path="../data/Indian Airlines.csv"):
-        """Load real flight data from CSV"""
+        """Load real flight data from CSV, or an empty frame when it can't be read"""
         try:
             print(f"Loading real flight data from {csv_path}...")
-            df = pd.read_csv(csv_path)
-            
-            # Clean and prepare the data
-            data = []
-            for _, row in df.iterrows():
-                try:
-                    # Parse departure time category
-                    departure_hour_map = {
-                        'Early_Morning': 6,
-                        'Morning': 9,
-                        'Afternoon': 14,
-                        'Evening': 18,
-                        'Night': 21,
-                        'Late_Night': 23
-                    }
-                    
-                    departure_hour = departure_hour_map.get(row['departure_time'], 12)
-                    
-                    # Create a synthetic departure datetime for feature extraction
-                    base_date = datetime(2024, 6, 15)  # Fixed date for consistency
-                    departure_time = base_date.replace(hour=departure_hour)
-                    
-                    # Map stops
-                    stops_map = {'zero': 0, 'one': 1, 'two': 2}
-                    total_stops = stops_map.get(row['stops'], 0)
-                    
-                    # Parse duration (assuming it's in hours)
-                    journey_duration_hours = float(row['duration']) if pd.notna(row['duration']) else 2.0
-                    
-                    # Route popularity (major routes)
-                    popular_routes = [('Delhi', 'Mumbai'), ('Mumbai', 'Bangalore'), ('Delhi', 'Bangalore'),
-                                    ('Chennai', 'Mumbai'), ('Delhi', 'Chennai'), ('Mumbai', 'Chennai'),
-                                    ('Kolkata', 'Mumbai'), ('Hyderabad', 'Mumbai'), ('Delhi', 'Kolkata')]
-                    route_popularity = 1 if (row['source_city'], row['destination_city']) in popular_routes or \
-                                      (row['destination_city'], row['source_city']) in popular_routes else 0
-                    
-                    # Check if weekend (assume random for historical data)
-                    is_weekend = departure_time.weekday() >= 5
-                    
-                    # Holiday season
-                    is_holiday_season = departure_time.month in [12, 1, 4, 5, 10]
-                    
-                    data.append({
-                        'airline': row['airline'],
-                        'source_city': row['source_city'],
-                        'destination_city': row['destination_city'],
-                        'departure_time': departure_time,
-                        'departure_hour': departure_hour,
-                        'departure_day': departure_time.day,
-                        'departure_month': departure_time.month,
-                        'departure_weekday': departure_time.weekday(),
-                        'journey_duration_hours': journey_duration_hours,
-                        'total_stops': total_stops,
-                        'days_until_departure': int(row['days_left']) if pd.notna(row['days_left']) else 30,
-                        'is_weekend': int(is_weekend),
-                        'is_holiday_season': int(is_holiday_season),
-                        'route_popularity': route_popularity,
-                        'price': int(row['price']) if pd.notna(row['price']) and row['price'] > 0 else 5000
-                    })
-                except Exception as e:
-                    print(f"Error processing row: {e}")
-                    continue
-            
+            df = pd.read_csv(csv_path, usecols=REAL_DATA_COLUMNS, dtype=REAL_DATA_DTYPES)
+            data = self._transform_real_data(df)
             print(f"Loaded {len(data)} flight records from CSV")
-            return pd.DataFrame(data)
+            return data
             
         except Exception as e:
             print(f"Error loading real data: {e}")
-            print("Falling back to synthetic data...")
-            return self.prepare_synthetic_data()
+            return pd.DataFrame()
 
-    def prepare_synthetic_data(self):
-        """Generate synthetic flight data for training"""
-        np.random.seed(42)
-        
-        # Indian airlines and cities
-        airlines = ['IndiGo', 'SpiceJet', 'Air India', 'Vistara', 'AirAsia India', 'Akasa Air']
-        cities = ['Delhi', 'Mumbai', 'Bangalore', 'Chennai', 'Kolkata', 'Hyderabad', 
-                 'Pune', 'Ahmedabad', 'Kochi', 'Goa', 'Jaipur', 'Lucknow']
-        
-        n_samples = 10000
-        data = []
-        
-        for i in range(n_samples):
-            airline = np.random.choice(airlines)
-            source = np.random.choice(cities)
-            destination = np.random.choice([c for c in cities if c != source])
-            
-            # Random departure time
-            base_date = datetime(2024, 1, 1) + timedelta(days=np.random.randint(0, 365))
-            departure_time = base_date + timedelta(hours=np.random.randint(5, 23))
-            
-            # Journey duration based on route
-            duration_hours = np.random.uniform(1.5, 8.0)
-            stops = np.random.choice([0, 1, 2], p=[0.6, 0.3, 0.1])
-            
-            # Days until departure (booking advance)
-            days_until_departure = np.random.randint(1, 180)
-            
-            # Route popularity (major routes are more popular)
-            popular_routes = [('Delhi', 'Mumbai'), ('Mumbai', 'Bangalore'), ('Delhi', 'Bangalore'),
-                            ('Chennai', 'Mumbai'), ('Delhi', 'Chennai'), ('Mumbai', 'Chennai')]
-            route_popularity = 1 if (source, destination) in popular_routes or (destination, source) in popular_routes else 0
-            
-            # Price calculation with realistic factors
-            base_price = 3000
-            
-            # Airline factor
-            airline_multiplier = {
-                'IndiGo': 1.0, 'SpiceJet': 0.9, 'Air India': 1.2,
-                'Vistara': 1.3, 'AirAsia India': 0.85, 'Akasa Air': 0.95
-            }
-            base_price *= airline_multiplier[airline]
-            
-            # Duration factor
-            base_price += duration_hours * 200
-            
-            # Stops factor
-            base_price *= (1 - stops * 0.15)
-            
-            # Advance booking factor
-            if days_until_departure < 7:
-                base_price *= 1.4
-            elif days_until_departure < 30:
-                base_price *= 1.1
-            elif days_until_departure > 90:
-                base_price *= 0.9
-            
-            # Weekend factor
-            is_weekend = departure_time.weekday() >= 5
-            if is_weekend:
-                base_price *= 1.15
-            
-            # Holiday season factor
-            is_holiday_season = departure_time.month in [12, 1, 4, 5, 10]
-            if is_holiday_season:
-                base_price *= 1.2
-            
-            # Route popularity factor
-            if route_popularity:
-                base_price *= 0.95  # Popular routes have more competition
-            
-            # Add some noise
-            base_price *= np.random.uniform(0.8, 1.2)
-            
-            data.append({
-                'airline': airline,
-                'source_city': source,
-                'destination_city': destination,
-                'departure_time': departure_time,
-                'departure_hour': departure_time.hour,
-                'departure_day': departure_time.day,
-                'departure_month': departure_time.month,
-                'departure_weekday': departure_time.weekday(),
-                'journey_duration_hours': duration_hours,
-                'total_stops': stops,
-                'days_until_departure': days_until_departure,
-                'is_weekend': int(is_weekend),
-                'is_holiday_season': int(is_holiday_season),
-                'route_popularity': route_popularity,
-                'price': max(1500, int(base_price))  # Minimum price floor
-            })
-        
-        return pd.DataFrame(data)
+    def stream_real_data(self, csv_path, cache_dir, chunk_size=200_000):
+        """Transform the CSV chunk by chunk into an on-disk columnar cache, holding one chunk in memory"""
+        try:
+            print(f"Streaming flight data from {csv_path} in chunks of {chunk_size} rows...")
+            chunks = pd.read_csv(csv_path, usecols=REAL_DATA_COLUMNS, dtype=REAL_DATA_DTYPES, chunksize=chunk_size)
+            writer = ColumnarCacheWriter(cache_dir)
+            try:
+                for chunk in chunks:
+                    writer.append(self._transform_real_data(chunk))
+            except Exception:
+                writer.abort()
+                raise
+            cache = writer.close()
+            print(f"Cached {cache.rows} flight records in {cache_dir}/")
+            return cache
+        except Exception as e:
+            print(f"Error streaming real data: {e}")
+            return None
+
+    def _transform_real_data(self, df):
+        """Derive the training columns from raw CSV rows"""
+        # Numeric columns are parsed natively when clean; coercing means a malformed value only drops its row
+        duration = pd.to_numeric(df['duration'], errors='coerce')
+        days_left = pd.to_numeric(df['days_left'], errors='coerce')
+        price = pd.to_numeric(df['price'], errors='coerce')
+        malformed = ((df['duration'].notna() & duration.isna()) |
+                     (df['days_left'].notna() & ~np.isfinite(days_left)) |
+                     (df['price'].notna() & price.isna()) | (price == np.inf))
+        if malformed.any():
+            print(f"Skipping {int(malformed.sum())} malformed rows")
+            keep = ~malformed
+            df, duration, days_left, price = df[keep], duration[keep], days_left[keep], price[keep]
+        
+        departure_hour = self._map_categories(df['departure_time'], DEPARTURE_TIME_HOURS, 12)
+        
+        # The dataset has no dates, so every flight departs on the same fixed day
+        base_date = REAL_DATA_BASE_DATE
+        routes = pd.MultiIndex.from_arrays([df['source_city'], df['destination_city']])
+        
+        return pd.DataFrame({
+            'airline': df['airline'],
+            'source_city': df['source_city'],
+            'destination_city': df['destination_city'],
+            'departure_time': pd.Timestamp(base_date) + pd.to_timedelta(departure_hour, unit='h'),
+            'departure_hour': departure_hour,
+            'departure_day': base_date.day,
+            'departure_month': base_date.month,
+            'departure_weekday': base_date.weekday(),
+            'journey_duration_hours': duration.fillna(2.0).to_numpy(),
+            'total_stops': self._map_categories(df['stops'], STOPS_MAP, 0),
+            'days_until_departure': days_left.fillna(30).to_numpy().astype(np.int64),
+            'is_weekend': int(base_date.weekday() >= 5),
+            'is_holiday_season': int(base_date.month in HOLIDAY_MONTHS),
+            'route_popularity': routes.isin(TRAINING_POPULAR_ROUTES).astype(int),
+            'price': price.where(price > 0, 5000).to_numpy().astype(np.int64)
+        }).reset_index(drop=True)
+
+    @staticmethod
+    def _map_categories(column, mapping, default):
+        """Map a categorical column through a dict once per category instead of once per row"""
+        categories = column.cat.categories
+        table = np.array([mapping.get(category, default) for category in categories] + [default])
+        # Missing values have code -1, which selects the trailing default
+        return table[column.cat.codes.to_numpy()]
+    
+    @staticmethod
+    def _parse_distinct(values, parse):
+        """Apply a string parser once per distinct value instead of once per row"""
+        codes, uniques = pd.factorize(values)
+        table = np.array([parse(value) for value in uniques] + [parse(None)], dtype=object)
+        # Missing values have code -1, which selects the trailing parse(None)
+        return table[codes]
+
+    def prepare_synthetic_data(self, n_samples=10000, seed=42):
+        """Generate synthetic flight data for training, vectorized over all samples"""
+        rng = np.random.default_rng(seed)
+        n_cities = len(SYNTHETIC_CITIES)
+        
+        airline_idx = rng.integers(0, len(SYNTHETIC_AIRLINES), n_samples)
+        source_idx = rng.integers(0, n_cities, n_samples)
+        # A non-zero offset picks uniformly among the other cities
+        destination_idx = (source_idx + rng.integers(1, n_cities, n_samples)) % n_cities
+        
+        # Random departure time
+        departure_times = pd.Timestamp(2024, 1, 1) + pd.to_timedelta(
+            rng.integers(0, 365, n_samples) * 24 + rng.integers(5, 23, n_samples), unit='h'
+        )
+        
+        # Journey duration, stops and booking advance
+        duration_hours = rng.uniform(1.5, 8.0, n_samples)
+        stops = rng.choice([0, 1, 2], size=n_samples, p=[0.6, 0.3, 0.1])
+        days_until_departure = rng.integers(1, 180, n_samples)
+        
+        # Route popularity (major routes are more popular)
+        popular = np.zeros((n_cities, n_cities), dtype=int)
+        for source, destination in SYNTHETIC_POPULAR_ROUTES:
+            i, j = SYNTHETIC_CITIES.index(source), SYNTHETIC_CITIES.index(destination)
+            popular[i, j] = popular[j, i] = 1
+        route_popularity = popular[source_idx, destination_idx]
+        
+        is_weekend = departure_times.weekday >= 5
+        is_holiday_season = departure_times.month.isin(HOLIDAY_MONTHS)
+        
+        # Price calculation with realistic factors
+        multipliers = np.array([AIRLINE_PRICE_MULTIPLIERS[airline] for airline in SYNTHETIC_AIRLINES])
+        price = 3000 * multipliers[airline_idx]
+        price += duration_hours * 200
+        price *= 1 - stops * 0.15
+        price *= np.select(
+            [days_until_departure < 7, days_until_departure < 30, days_until_departure > 90],
+            [1.4, 1.1, 0.9], default=1.0
+        )
+        price *= np.where(is_weekend, 1.15, 1.0)
+        price *= np.where(is_holiday_season, 1.2, 1.0)
+        price *= np.where(route_popularity == 1, 0.95, 1.0)  # Popular routes have more competition
+        price *= rng.uniform(0.8, 1.2, n_samples)  # Noise
+        
+        return pd.DataFrame({
+            'airline': pd.Categorical.from_codes(airline_idx, SYNTHETIC_AIRLINES),
+            'source_city': pd.Categorical.from_codes(source_idx, SYNTHETIC_CITIES),
+            'destination_city': pd.Categorical.from_codes(destination_idx, SYNTHETIC_CITIES),
+            'departure_time': departure_times,
+            'departure_hour': departure_times.hour.astype(np.int64),
+            'departure_day': departure_times.day.astype(np.int64),
+            'departure_month': departure_times.month.astype(np.int64),
+            'departure_weekday': departure_times.weekday.astype(np.int64),
+            'journey_duration_hours': duration_hours,
+            'total_stops': stops,
+            'days_until_departure': days_until_departure,
+            'is_weekend': is_weekend.astype(int),
+            'is_holiday_season': is_holiday_season.astype(int),
+            'route_popularity': route_popularity,
+            'price': np.maximum(1500, price.astype(np.int64))  # Minimum price floor
+        })
     
     def encode_features(self, df, fit=True):
         """Encode categorical features"""
@@ -200,47 +299,49 @@ class FlightPriceMLModel:
                 self.label_encoders[col] = LabelEncoder()
                 df[f'{col}_encoded'] = self.label_encoders[col].fit_transform(df[col])
             else:
-                # Handle unknown categories
-                known_categories = set(self.label_encoders[col].classes_)
-                df[f'{col}_encoded'] = df[col].apply(
-                    lambda x: self.label_encoders[col].transform([x])[0] if x in known_categories else -1
-                )
+                df[f'{col}_encoded'] = self._encode_column(col, df[col])
         
         return df
     
     def train_model(self):
         """Train the ML model"""
-        print("Loading real flight data...")
-        df = self.load_real_data()
+        X, y = self._load_training_matrix()
+        route_codes = self._route_codes(X)
+        route_catalog = self._build_route_catalog(X, y)
         
-        if df.empty:
-            print("No data available, generating synthetic data...")
-            df = self.prepare_synthetic_data()
+        # The catalog and city index stay built from the training data alone
+        history = self._history_training_matrix(self._build_city_index(route_codes)['routes'])
+        if history is not None:
+            print(f"Adding {len(history[1])} stored scraped prices to the training data")
+            X = np.vstack([X, history[0]])
+            y = np.concatenate([y, history[1]])
         
-        print("Encoding features...")
-        df = self.encode_features(df, fit=True)
-        
-        print("Preparing training data...")
-        X = df[self.feature_columns]
-        y = df['price']
-        
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
+        # Scale features, in place when X is already a private array
+        self.scaler.fit(X)
+        X_scaled = self.scaler.transform(X, copy=False)
         
         # Split data
         X_train, X_test, y_train, y_test = train_test_split(
             X_scaled, y, test_size=0.2, random_state=42
         )
         
-        print("Training Random Forest model...")
-        self.model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=20,
-            random_state=42,
-            n_jobs=-1
-        )
+        family, params = self._select_model(X_train, y_train) if self.model_search else \
+            (self.model_backend, DEFAULT_MODEL_PARAMS[self.model_backend])
+        print(f"Training {family} model with {params}...")
+        if family in BOOSTED_BACKENDS:
+            model = QuantileBoostedModel(family, params, self.interval_quantiles)
+        else:
+            model = make_estimator(family, params)
         
-        self.model.fit(X_train, y_train)
+        # Fit into a local so concurrent readers never see an unfitted model
+        model.fit(X_train, y_train)
+        self.category_codes = self._build_encoding_tables()
+        self.city_index = self._build_city_index(route_codes)
+        self.route_catalog = route_catalog
+        self.holdout = self._holdout_frame(X_test[:HOLDOUT_ROWS], y_test[:HOLDOUT_ROWS])
+        self._publish(model, None if family in BOOSTED_BACKENDS else self._build_leaf_table(model))
+        self.state = 'ready'
+        self.trend_cache.clear()
         
         # Evaluate model
         y_pred = self.model.predict(X_test)
@@ -253,97 +354,586 @@ class FlightPriceMLModel:
         
         return self.model
     
-    def predict_price(self, flight_params):
-        """Predict flight price for given parameters"""
-        if self.model is None:
-            raise ValueError("Model not trained. Call train_model() first.")
+    @property
+    def model(self):
+        return self._serving[0]
+    
+    @property
+    def leaf_values(self):
+        return self._serving[1]
+    
+    @property
+    def compiled_forest(self):
+        return self._serving[2]
+    
+    def _publish(self, model, leaf_values):
+        """Start serving a fitted model together with its leaf table and compiled forest"""
+        self._serving = self._prepare_serving(model, leaf_values)
+    
+    def _prepare_serving(self, model, leaf_values):
+        return (model, leaf_values, self._compile_forest(model), next(self._generations))
+    
+    def add_observations(self, records):
+        """Buffer observed prices (flight parameters plus 'price') for the next incremental update.
         
-        # Create dataframe from parameters
-        df = pd.DataFrame([flight_params])
+        Records whose date, time or price cannot be used are dropped here, so one bad record
+        cannot fail the update that would consume the whole window.
+        """
+        records = list(records)
+        valid = [record for record in records if self._is_valid_observation(record)]
+        if len(valid) < len(records):
+            print(f"Dropped {len(records) - len(valid)} unusable observations")
+        with self._observations_lock:
+            self._observations.extend(valid)
+    
+    @staticmethod
+    def _is_valid_observation(record):
+        try:
+            datetime.strptime(f"{record['departure_date']} {record.get('departure_time') or '10:00'}",
+                              '%Y-%m-%d %H:%M')
+            return float(record['price']) > 0
+        except (KeyError, TypeError, ValueError):
+            return False
+    
+    def take_observations(self):
+        """Remove and return every buffered observation"""
+        with self._observations_lock:
+            records = list(self._observations)
+            self._observations.clear()
+        return records
+    
+    def update_incrementally(self, holdout=None, max_mae_regression=0.05):
+        """Grow the model on the buffered observations without a full retrain.
         
-        # Add derived features
-        departure_time = datetime.strptime(flight_params['departure_date'] + ' ' + 
-                                         flight_params.get('departure_time', '10:00'), '%Y-%m-%d %H:%M')
+        Forests get incremental_trees new trees fitted on the window via warm_start, and the oldest
+        trees beyond max_ensemble_size are evicted. Boosted models get that many extra rounds, up to
+        max_ensemble_size rounds beyond their last full fit. With a holdout frame, the grown model
+        only replaces the served one if its holdout MAE is within max_mae_regression of it; otherwise
+        the summary has 'rejected' set and the window is discarded.
+        Returns a summary, or None when there was nothing to do.
+        """
+        serving = self._serving
+        model = serving[0]
+        if model is None:
+            return None
+        if isinstance(model, FlatForest):
+            raise ValueError("A memory-mapped forest cannot be grown; load the pickled model to update it")
+        
+        if isinstance(model, QuantileBoostedModel) and model.rounds_left(self.max_ensemble_size) < self.incremental_trees:
+            # Checked before the buffer is drained, so the window carries over to a retrained model
+            print(f"Skipping incremental update: only {model.rounds_left(self.max_ensemble_size)} more boosting "
+                  f"rounds are allowed before a full retrain")
+            return None
+        with self._observations_lock:
+            if len(self._observations) < self.min_update_samples:
+                return None
+        records = self.take_observations()
+        
+        # A flight scraped again once the search cache expires is the same observation; count it once
+        window = pd.DataFrame(records).drop_duplicates()
+        X = self._build_feature_matrix(window)
+        y = window['price'].to_numpy(dtype=np.float64)
+        
+        evicted = 0
+        if isinstance(model, QuantileBoostedModel):
+            grown = model.grow(X, y, self.incremental_trees, self.max_ensemble_size)
+            ensemble_size = grown.n_rounds
+            leaf_values = None
+        else:
+            grown, evicted = self._grow_forest(model, X, y)
+            ensemble_size = len(grown.estimators_)
+            leaf_values = self._build_leaf_table(grown)
+        
+        summary = {'samples': len(window), 'added': self.incremental_trees, 'evicted': evicted,
+                   'ensemble_size': ensemble_size}
+        candidate = self._prepare_serving(grown, leaf_values)
+        if holdout is not None:
+            summary['served_holdout_mae'] = self.evaluate_holdout(holdout, serving)['mae']
+            summary['candidate_holdout_mae'] = self.evaluate_holdout(holdout, candidate)['mae']
+            limit = summary['served_holdout_mae'] * (1 + max_mae_regression)
+            if summary['candidate_holdout_mae'] > limit:
+                summary['rejected'] = True
+                print(f"Rejected incremental update on {len(window)} observations: "
+                      f"holdout MAE {summary['candidate_holdout_mae']:.2f} is above {limit:.2f}")
+                return summary
+        
+        self._serving = candidate
+        self.trend_cache.clear()
+        
+        print(f"Incremental update on {len(window)} observations: "
+              f"+{self.incremental_trees} -{evicted}, ensemble size {ensemble_size}")
+        return summary
+    
+    def _grow_forest(self, model, X, y):
+        """Copy of a fitted forest with extra trees fitted on (X, y), oldest trees evicted past the bound"""
+        grown = copy.copy(model)
+        # warm_start appends to estimators_, so give the copy its own list and leave the served one alone
+        grown.estimators_ = list(model.estimators_)
+        grown.set_params(warm_start=True, n_estimators=len(grown.estimators_) + self.incremental_trees)
+        grown.fit(X, y)
+        
+        evicted = max(0, len(grown.estimators_) - self.max_ensemble_size)
+        grown.estimators_ = grown.estimators_[evicted:]
+        grown.set_params(warm_start=False, n_estimators=len(grown.estimators_))
+        return grown, evicted
+    
+    def _select_model(self, X_train, y_train):
+        """Family and parameters with the best latency-aware CV score"""
+        print("Running hyperparameter search...")
+        results = run_search(
+            X_train, y_train, n_splits=self.search_folds, max_workers=self.search_workers,
+            latency_weight=self.latency_weight, p99_budget_ms=self.p99_budget_ms
+        )
+        for result in results:
+            print(f"  {result['family']} {result['params']}: MAE ₹{result['mae']:.2f}, "
+                  f"p99 {result['p99_latency_ms']:.2f} ms, fit {result['fit_seconds']:.2f}s")
+        self.search_results = results
+        
+        best = results[0]
+        if math.isinf(best['score']):
+            print(f"No candidate meets the latency budget, using the default {self.model_backend} model")
+            return self.model_backend, DEFAULT_MODEL_PARAMS[self.model_backend]
+        return best['family'], best['params']
+    
+    def _load_training_matrix(self):
+        """Feature matrix and price target, from the feature store when it has this data and feature version"""
+        if self.feature_store is None:
+            return self._build_training_matrix()[:2]
+        
+        source = self.data_path if os.path.exists(self.data_path) else None
+        key = self.feature_store.key(source, FEATURE_VERSION, self.feature_columns)
+        stored = self.feature_store.load(key)
+        if stored is not None:
+            print(f"Loaded training features from feature store entry {key}")
+            X, y, self.label_encoders = stored
+            return X, y
+        
+        X, y, used_source = self._build_training_matrix()
+        if used_source != source:
+            # The CSV was not actually read and synthetic data was used, so it must not be stored under the CSV's key
+            key = self.feature_store.key(used_source, FEATURE_VERSION, self.feature_columns)
+        self.feature_store.save(key, X, y, self.label_encoders, source=used_source or 'synthetic')
+        print(f"Saved training features to feature store entry {key}")
+        return X, y
+    
+    def _history_training_matrix(self, routes):
+        """Unscaled features and prices of the scraped prices stored for the given routes
+        ({source: [destinations]}) in the last history_training_days days, or None when there are none"""
+        if not self.history_path or not os.path.exists(self.history_path):
+            return None
+        store = PriceHistoryStore(self.history_path)
+        start_date = (pd.Timestamp.now().normalize() - pd.Timedelta(days=self.history_training_days)).strftime('%Y-%m-%d')
+        frames = [
+            store.observations(source, destination, start_date=start_date)
+            for source, destinations in routes.items() for destination in destinations
+        ]
+        history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        if history.empty:
+            return None
+        
+        df = pd.DataFrame({
+            'airline': history['airline'],
+            'source_city': history['origin'],
+            'destination_city': history['destination'],
+            'departure_date': history['departure_date'],
+            'departure_time': self._parse_distinct(history['departure_time'], parse_departure_time),
+            'journey_duration_hours': self._parse_distinct(history['duration'], parse_duration_hours).astype(np.float64),
+            'total_stops': history['stops'],
+            'price': history['price'],
+            'observed_date': history['observed_date']
+        })
+        departure_times = pd.to_datetime(df['departure_date'] + ' ' + df['departure_time'],
+                                         format='%Y-%m-%d %H:%M', errors='coerce')
+        observed_dates = pd.to_datetime(df['observed_date'], format='%Y-%m-%d', errors='coerce')
+        prices = pd.to_numeric(df['price'], errors='coerce')
+        valid = departure_times.notna() & observed_dates.notna() & (prices > 0)
+        if not valid.all():
+            print(f"Skipping {int((~valid).sum())} stored prices with an unusable date or price")
+            df = df[valid]
+        if df.empty:
+            return None
+        df = self._derive_features(df)
+        # Booking window as it was when the price was observed, not as it is today
+        df['days_until_departure'] = (
+            departure_times[valid].dt.normalize() - observed_dates[valid]
+        ).dt.days.clip(lower=0)
+        X = self._encoded_features(df, self._build_encoding_tables())
+        
+        # Airlines and cities the encoders never saw (e.g. "GoAir", or "IndiGo" against the CSV's
+        # "Indigo") would train on UNKNOWN_CATEGORY_CODE and could land in the holdout, so drop them
+        category_positions = [self.feature_columns.index(f'{col}_encoded') for col in self.label_encoders]
+        known = (X[:, category_positions] != UNKNOWN_CATEGORY_CODE).all(axis=1)
+        if not known.all():
+            print(f"Skipping {int((~known).sum())} stored prices with an airline or city unknown to the encoders")
+        if not known.any():
+            return None
+        return X[known], df['price'].to_numpy(dtype=np.float64)[known]
+    
+    def _build_training_matrix(self):
+        """Derive and encode training features, streamed through the columnar cache when configured.
         
-        df['departure_hour'] = departure_time.hour
-        df['departure_day'] = departure_time.day
-        df['departure_month'] = departure_time.month
-        df['departure_weekday'] = departure_time.weekday()
-        df['is_weekend'] = int(departure_time.weekday() >= 5)
-        df['is_holiday_season'] = int(departure_time.month in [12, 1, 4, 5, 10])
+        Returns the features, the target and the data source actually used: the CSV path, or None
+        when it was missing, unreadable or empty and synthetic data was generated instead.
+        """
+        source = self.data_path
+        if self.stream_chunk_size:
+            cache = self.stream_real_data(self.data_path, self.data_cache_dir, self.stream_chunk_size)
+            if cache is not None and cache.rows > 0:
+                print("Encoding features...")
+                return (*self._training_matrix_from_cache(cache), source)
+            print("No data streamed, generating synthetic data...")
+            df = self.prepare_synthetic_data()
+            source = None
+        else:
+            print("Loading real flight data...")
+            df = self.load_real_data(self.data_path)
+        
+        if df.empty:
+            print("No data available, generating synthetic data...")
+            df = self.prepare_synthetic_data()
+            source = None
+        
+        print("Encoding features...")
+        df = self.encode_features(df, fit=True)
+        
+        print("Preparing training data...")
+        # Column-major like the cache path, so both give bit-identical scaler statistics
+        X = np.asfortranarray(df[self.feature_columns].to_numpy(dtype=np.float64))
+        return X, df['price'].to_numpy(), source
+    
+    def _training_matrix_from_cache(self, cache):
+        """Fit the label encoders and assemble the feature matrix column by column from the cache"""
+        X = np.empty((cache.rows, len(self.feature_columns)), order='F')
+        for i, name in enumerate(self.feature_columns):
+            if name.endswith('_encoded'):
+                col = name[:-len('_encoded')]
+                categories = cache.categories(col)
+                self.label_encoders[col] = LabelEncoder().fit(categories)
+                # Cache codes index the category list; -1 (missing) selects the trailing unknown code
+                lookup = np.append(self.label_encoders[col].transform(categories), UNKNOWN_CATEGORY_CODE)
+                X[:, i] = lookup[cache.column(col)]
+            else:
+                X[:, i] = cache.column(name)
+        return X, np.asarray(cache.column('price'))
+    
+    def train_in_background(self, model_dir='models', on_complete=None):
+        """Train and save on a daemon thread; the rule-based fallback serves until it finishes"""
+        def run():
+            try:
+                self.train_model()
+                self.save_model(model_dir)
+                if on_complete is not None:
+                    on_complete()
+            except Exception as e:
+                self.state = 'failed'
+                print(f"Background training failed: {e}")
+        
+        self.state = 'training'
+        thread = threading.Thread(target=run, name='model-training', daemon=True)
+        thread.start()
+        return thread
+    
+    def _route_codes(self, X):
+        """Distinct (source, destination) code pairs in an unscaled feature matrix"""
+        sources = X[:, self.feature_columns.index('source_city_encoded')].astype(np.int64)
+        destinations = X[:, self.feature_columns.index('destination_city_encoded')].astype(np.int64)
+        # One 1-D unique over packed pairs instead of a row-wise unique
+        width = int(destinations.max()) + 1 if len(destinations) else 1
+        pairs = np.unique(sources * width + destinations)
+        return np.column_stack([pairs // width, pairs % width])
+    
+    def _build_route_catalog(self, X, y):
+        """Route catalog aggregated from an unscaled training matrix and its prices"""
+        def column(name):
+            return X[:, self.feature_columns.index(name)]
+        
+        def decode(col):
+            return self.label_encoders[col].classes_[column(f'{col}_encoded').astype(np.int64)]
+        
+        weekdays = column('departure_weekday').astype(np.int64)
+        # The real dataset has no dates and pins every row to one weekday, which says nothing per weekday
+        if len(weekdays) and (weekdays == weekdays[0]).all():
+            weekdays = None
+        
+        catalog = RouteCatalog()
+        catalog.add_arrays(
+            decode('source_city'), decode('destination_city'), y,
+            weekdays, column('journey_duration_hours'), decode('airline')
+        )
+        return catalog
+    
+    def _build_city_index(self, route_codes=()):
+        """Sorted city names plus destinations per source city for the given route code pairs"""
+        sources = self.label_encoders['source_city'].classes_
+        destinations = self.label_encoders['destination_city'].classes_
+        routes = {}
+        for source, destination in route_codes:
+            routes.setdefault(str(sources[source]), []).append(str(destinations[destination]))
+        return {
+            'cities': sorted(set(map(str, sources)) | set(map(str, destinations))),
+            'routes': {source: sorted(dests) for source, dests in sorted(routes.items())}
+        }
+    
+    @staticmethod
+    def fallback_city_index(model_dir='models'):
+        """City index for while no model is loaded: the cities of the label encoders saved in
+        model_dir, or the synthetic cities when there are none. Routes are unknown."""
+        try:
+            encoders = joblib.load(f'{model_dir}/label_encoders.pkl')
+            cities = set(map(str, encoders['source_city'].classes_)) | set(map(str, encoders['destination_city'].classes_))
+        except Exception:
+            cities = SYNTHETIC_CITIES
+        return {'cities': sorted(cities), 'routes': {}}
+    
+    def _build_encoding_tables(self):
+        """Category -> code dict per label encoder, so encoding a value is a single hash lookup"""
+        return {
+            col: {str(category): code for code, category in enumerate(encoder.classes_)}
+            for col, encoder in self.label_encoders.items()
+        }
+    
+    def _encode_column(self, col, values, category_codes=None):
+        """Encode a column of categories through its lookup table, UNKNOWN_CATEGORY_CODE for unseen values"""
+        table = (category_codes or self.category_codes)[col]
+        return np.fromiter((table.get(value, UNKNOWN_CATEGORY_CODE) for value in values),
+                           dtype=np.int64, count=len(values))
+
+    def _derive_features(self, df):
+        """Add the date, booking-window and route features used by the model"""
+        df = df.copy()
+        if 'departure_time' not in df:
+            df['departure_time'] = '10:00'
+        
+        # Add derived features
+        departure_times = pd.to_datetime(
+            df['departure_date'] + ' ' + df['departure_time'].fillna('10:00'),
+            format='%Y-%m-%d %H:%M'
+        )
+        df['departure_hour'] = departure_times.dt.hour
+        df['departure_day'] = departure_times.dt.day
+        df['departure_month'] = departure_times.dt.month
+        df['departure_weekday'] = departure_times.dt.weekday
+        df['is_weekend'] = (df['departure_weekday'] >= 5).astype(int)
+        df['is_holiday_season'] = df['departure_month'].isin(HOLIDAY_MONTHS).astype(int)
         
         # Calculate days until departure
-        days_until = (departure_time.date() - datetime.now().date()).days
-        df['days_until_departure'] = max(0, days_until)
+        today = pd.Timestamp(datetime.now().date())
+        df['days_until_departure'] = (departure_times.dt.normalize() - today).dt.days.clip(lower=0)
         
-        # Route popularity
-        popular_routes = [('Delhi', 'Mumbai'), ('Mumbai', 'Bangalore'), ('Delhi', 'Bangalore')]
-        route = (flight_params['source_city'], flight_params['destination_city'])
-        df['route_popularity'] = int(route in popular_routes or route[::-1] in popular_routes)
+        # Route popularity, one set lookup per row
+        df['route_popularity'] = np.fromiter(
+            (route in INFERENCE_POPULAR_ROUTE_SET for route in zip(df['source_city'], df['destination_city'])),
+            dtype=np.int64, count=len(df)
+        )
+        return df
+    
+    def _build_feature_matrix(self, df):
+        """Derive, encode and scale features for a frame of flight parameters"""
+        return self._scaled_features(self._derive_features(df))
+    
+    def _scaled_features(self, df):
+        """Encode and scale a frame that already holds the raw categories and derived features"""
+        # Same arithmetic as StandardScaler.transform without the per-call validation
+        return (self._encoded_features(df) - self.scaler.mean_) / self.scaler.scale_
+    
+    def _encoded_features(self, df, category_codes=None):
+        """Unscaled feature matrix; category_codes overrides the serving lookup tables during training"""
+        # Encode categorical features straight into the matrix instead of adding frame columns
+        encoded = {
+            f'{col}_encoded': self._encode_column(col, df[col], category_codes) for col in self.label_encoders
+        }
+        return np.column_stack([
+            encoded[name] if name in encoded else df[name].to_numpy() for name in self.feature_columns
+        ]).astype(np.float64)
+    
+    def _build_leaf_table(self, model):
+        """Stack the node values of every tree into one (n_trees, max_nodes) lookup table"""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        leaf_values = np.zeros((len(trees), max(tree.node_count for tree in trees)))
+        for i, tree in enumerate(trees):
+            leaf_values[i, :tree.node_count] = tree.value[:, 0, 0]
+        return leaf_values
+    
+    def _compile_forest(self, model):
+        """Flat-array copy of the forest for the compiled backend, verified against sklearn"""
+        if isinstance(model, FlatForest):
+            return model
+        if isinstance(model, QuantileBoostedModel) or self.inference_backend == 'sklearn':
+            return None
         
-        # Encode categorical features
-        df = self.encode_features(df, fit=False)
+        forest = FlatForest.from_sklearn(model)
+        # Standardized features are roughly N(0, 1); probe well past that range as well
+        probe = np.random.default_rng(0).normal(scale=3.0, size=(512, len(self.feature_columns)))
+        if not forest.matches(model, probe):
+            print("Compiled forest does not match sklearn predictions, using sklearn backend")
+            return None
+        return forest
+    
+    def _tree_outputs(self, X_scaled, serving):
+        """Per-tree predictions as an (n_samples, n_trees) matrix from a single apply() pass"""
+        model, leaf_values, forest = serving[:3]
+        if forest is not None and (forest is model or self.inference_backend == 'flat' or
+                                   X_scaled.shape[0] <= self.flat_max_rows):
+            # Plain NumPy traversal: no sklearn input validation or per-tree dispatch
+            return forest.predict_per_tree(X_scaled)
+        leaves = model.apply(X_scaled)
+        return leaf_values[np.arange(leaves.shape[1]), leaves]
+    
+    def _fallback_distribution(self, df):
+        """Rule-based prices from the synthetic pricing factors, used while no model is loaded"""
+        df = self._derive_features(df)
+        days_until = df['days_until_departure']
         
-        # Prepare features
-        X = df[self.feature_columns]
-        X_scaled = self.scaler.transform(X)
+        prices = 3000 * df['airline'].map(AIRLINE_PRICE_MULTIPLIERS).fillna(1.0)
+        prices += df['journey_duration_hours'].astype(float) * 200
+        prices *= 1 - df['total_stops'].astype(float) * 0.15
+        prices *= np.select([days_until < 7, days_until < 30, days_until > 90], [1.4, 1.1, 0.9], 1.0)
+        prices *= np.where(df['is_weekend'] == 1, 1.15, 1.0)
+        prices *= np.where(df['is_holiday_season'] == 1, 1.2, 1.0)
+        prices *= np.where(df['route_popularity'] == 1, 0.95, 1.0)
+        prices = np.maximum(prices.to_numpy(dtype=np.float64), 1500)
         
-        # Make prediction
-        predicted_price = self.model.predict(X_scaled)[0]
+        std_deviations = prices * FALLBACK_RELATIVE_STD
+        return prices, std_deviations, prices - 1.2816 * std_deviations, prices + 1.2816 * std_deviations
+    
+    def _predict_distribution(self, df, serving=None):
+        """Score a frame of flight parameters, returning mean, std and interval bounds per row"""
+        serving = serving or self._serving
+        if serving[0] is None:
+            if self.fallback_enabled:
+                return self._fallback_distribution(df)
+            raise ValueError("Model not trained. Call train_model() first.")
+        return self._distribution_from_matrix(self._build_feature_matrix(df), serving)
+    
+    def _distribution_from_matrix(self, X_scaled, serving):
+        model = serving[0]
+        if isinstance(model, QuantileBoostedModel):
+            return model.predict_distribution(X_scaled)
         
-        # Get prediction interval using Random Forest's prediction variance
-        predictions = np.array([tree.predict(X_scaled)[0] for tree in self.model.estimators_])
-        confidence = 1 - (np.std(predictions) / np.mean(predictions))
+        # Mean, spread and empirical interval all come from the same per-tree outputs.
+        # A fixed C layout keeps the reductions bit-identical across inference paths
+        tree_outputs = np.ascontiguousarray(self._tree_outputs(X_scaled, serving))
+        lower_prices, upper_prices = np.quantile(tree_outputs, self.interval_quantiles, axis=1)
+        return tree_outputs.mean(axis=1), tree_outputs.std(axis=1), lower_prices, upper_prices
+    
+    def _holdout_frame(self, X_scaled, y):
+        """Scaled test rows back as raw feature values, with categories as names rather than codes.
         
+        Names keep the benchmark valid for a model whose encoders assign different codes.
+        """
+        frame = pd.DataFrame(X_scaled * self.scaler.scale_ + self.scaler.mean_, columns=self.feature_columns)
+        for col, encoder in self.label_encoders.items():
+            codes = np.rint(frame.pop(f'{col}_encoded').to_numpy()).astype(np.int64)
+            frame[col] = encoder.classes_[codes]
+        frame['price'] = y
+        return frame
+    
+    def evaluate_holdout(self, holdout, serving=None):
+        """MAE and R² of the served model (or a given serving tuple) on a holdout frame from _holdout_frame"""
+        serving = serving or self._serving
+        if serving[0] is None:
+            raise ValueError("Model not trained. Call train_model() first.")
+        predicted_prices = self._distribution_from_matrix(self._scaled_features(holdout), serving)[0]
+        y = holdout['price'].to_numpy(dtype=np.float64)
         return {
-            'predicted_price': int(predicted_price),
-            'confidence': min(max(confidence, 0.6), 0.95),  # Bound between 60-95%
-            'price_range': {
-                'min': int(predicted_price * 0.85),
-                'max': int(predicted_price * 1.15)
-            },
-            'std_deviation': float(np.std(predictions))
+            'rows': len(holdout),
+            'mae': float(mean_absolute_error(y, predicted_prices)),
+            'r2': float(r2_score(y, predicted_prices))
         }
     
+    def predict_prices(self, flight_params_list):
+        """Predict flight prices for a batch of flight parameters"""
+        if len(flight_params_list) == 0:
+            return []
+        
+        predicted_prices, std_deviations, lower_prices, upper_prices = \
+            self._predict_distribution(pd.DataFrame(flight_params_list))
+        confidences = 1 - std_deviations / predicted_prices
+        
+        return [
+            {
+                'predicted_price': int(predicted_price),
+                'confidence': float(min(max(confidence, 0.6), 0.95)),  # Bound between 60-95%
+                'price_range': {
+                    'min': int(lower_price),
+                    'max': int(upper_price)
+                },
+                'std_deviation': float(std_deviation)
+            }
+            for predicted_price, confidence, std_deviation, lower_price, upper_price
+            in zip(predicted_prices, confidences, std_deviations, lower_prices, upper_prices)
+        ]
+    
+    def predict_price(self, flight_params):
+        """Predict flight price for given parameters"""
+        return self.predict_prices([flight_params])[0]
+    
     def get_price_trend(self, source_city, destination_city, days_ahead=30):
         """Generate price trend for a route over specified days"""
-        if self.model is None:
+        if self.model is None and not self.fallback_enabled:
             raise ValueError("Model not trained. Call train_model() first.")
         
-        trends = []
-        base_date = datetime.now()
+        # Horizon is capped so a single request cannot build an unbounded matrix
+        days_ahead = max(1, min(int(days_ahead), self.max_trend_days))
         
-        for days_until in range(1, days_ahead + 1):
-            departure_date = base_date + timedelta(days=days_until)
-            
-            # Create prediction parameters
-            flight_params = {
-                'airline': 'IndiGo',  # Use most common airline
-                'source_city': source_city,
-                'destination_city': destination_city,
-                'departure_date': departure_date.strftime('%Y-%m-%d'),
-                'departure_time': '10:00',
-                'journey_duration_hours': 2.5,
-                'total_stops': 0
+        # Trends only change with the calendar day, so they are cached per route, horizon and date.
+        # The model generation in the key keeps a trend computed on a replaced model from being
+        # cached under the new one after the cache was cleared
+        serving = self._serving
+        cache_key = (source_city, destination_city, days_ahead, datetime.now().date().isoformat(), serving[3])
+        cached_trends = self.trend_cache.get(cache_key)
+        if cached_trends is not None:
+            return list(cached_trends)
+        
+        days_until = np.arange(1, days_ahead + 1)
+        departure_dates = pd.Timestamp(datetime.now().date()) + pd.to_timedelta(days_until, unit='D')
+        date_strings = departure_dates.strftime('%Y-%m-%d')
+        
+        # One row per future day, all scored in a single batch
+        trend_frame = pd.DataFrame({
+            'airline': 'IndiGo',  # Use most common airline
+            'source_city': source_city,
+            'destination_city': destination_city,
+            'departure_date': date_strings,
+            'departure_time': '10:00',
+            'journey_duration_hours': self.route_catalog.typical_duration(source_city, destination_city),
+            'total_stops': 0
+        })
+        
+        try:
+            predicted_prices = self._predict_distribution(trend_frame, serving)[0]
+        except Exception as e:
+            print(f"Error predicting trend for {source_city} -> {destination_city}: {e}")
+            return []
+        
+        trends = [
+            {
+                'date': date,
+                'days_until': days,
+                'predicted_price': int(predicted_price),
+                'day_of_week': day_of_week,
+                'is_weekend': weekday >= 5
             }
-            
-            try:
-                prediction = self.predict_price(flight_params)
-                trends.append({
-                    'date': departure_date.strftime('%Y-%m-%d'),
-                    'days_until': days_until,
-                    'predicted_price': prediction['predicted_price'],
-                    'day_of_week': departure_date.strftime('%A'),
-                    'is_weekend': departure_date.weekday() >= 5
-                })
-            except Exception as e:
-                print(f"Error predicting for day {days_until}: {e}")
-                continue
+            for date, days, predicted_price, day_of_week, weekday in zip(
+                date_strings.tolist(), days_until.tolist(), predicted_prices,
+                departure_dates.day_name().tolist(), departure_dates.weekday.tolist()
+            )
+        ]
         
-        return trends
+        # Fallback trends are not cached so the trained model takes over as soon as it is ready
+        if serving[0] is not None:
+            self.trend_cache.set(cache_key, trends)
+        return list(trends)
     
-    def analyze_price_vs_current(self, current_price, source_city, destination_city, departure_date):
-        """Analyze current price vs predicted trend"""
+    def analyze_price_vs_current(self, current_price, source_city, destination_city, departure_date,
+                                 route_stats=None):
+        """Analyze current price vs predicted trend.
+        
+        route_stats is the route's catalog summary; callers holding a fresher catalog than this
+        instance (process-pool workers only see the saved one) pass it in.
+        """
+        if route_stats is None:
+            route_stats = self.route_catalog.summary(source_city, destination_city)
         try:
             # Get price trend for next 30 days
             trends = self.get_price_trend(source_city, destination_city, 30)
@@ -453,7 +1043,10 @@ class FlightPriceMLModel:
                     'max': max_price,
                     'average': round(avg_price),
                     'range': max_price - min_price
-                }
+                },
+                # Where the price sits among prices seen on this route, from the route catalog
+                'route_statistics': route_stats,
+                'current_price_percentile': price_percentile(route_stats, current_price) if route_stats else None
             }
             
         except Exception as e:
@@ -469,18 +1062,81 @@ class FlightPriceMLModel:
         """Save the trained model and encoders"""
         os.makedirs(model_dir, exist_ok=True)
         
-        if self.model:
-            joblib.dump(self.model, f'{model_dir}/flight_price_model.pkl')
+        model = self.model
+        if model is not None:
+            backend = 'forest'
+            if isinstance(model, QuantileBoostedModel):
+                model.save(f'{model_dir}/boosted')
+                backend = model.backend
+            # Flat node arrays can be memory-mapped and shared by every worker on the host
+            elif isinstance(model, FlatForest):
+                model.save(f'{model_dir}/forest')
+                flat_model, pickle_path = self._flat_source
+                if flat_model is model and os.path.exists(pickle_path):
+                    shutil.copyfile(pickle_path, f'{model_dir}/flight_price_model.pkl')
+            else:
+                joblib.dump(model, f'{model_dir}/flight_price_model.pkl')
+                FlatForest.from_sklearn(model).save(f'{model_dir}/forest')
+            # Tells load_model which artifact in model_dir is current
+            with open(f'{model_dir}/model_backend.json', 'w') as f:
+                json.dump({'backend': backend}, f)
             joblib.dump(self.label_encoders, f'{model_dir}/label_encoders.pkl')
+            if self.city_index is not None:
+                with open(f'{model_dir}/city_index.json', 'w') as f:
+                    json.dump(self.city_index, f)
+            self.route_catalog.save(f'{model_dir}/route_catalog.json')
             joblib.dump(self.scaler, f'{model_dir}/scaler.pkl')
+            if self.holdout is not None:
+                self.holdout.to_csv(f'{model_dir}/holdout.csv', index=False)
+            if self.search_results is not None:
+                with open(f'{model_dir}/model_selection.json', 'w') as f:
+                    json.dump(self.search_results, f, indent=2)
             print(f"Model saved to {model_dir}/")
     
+    @staticmethod
+    def load_holdout(path):
+        """Holdout frame saved by save_model, or None when the file is missing"""
+        if not os.path.exists(path):
+            return None
+        return pd.read_csv(path, dtype={'airline': str, 'source_city': str, 'destination_city': str})
+    
     def load_model(self, model_dir='models'):
         """Load the trained model and encoders"""
         try:
-            self.model = joblib.load(f'{model_dir}/flight_price_model.pkl')
+            backend = 'forest'
+            if os.path.exists(f'{model_dir}/model_backend.json'):
+                with open(f'{model_dir}/model_backend.json') as f:
+                    backend = json.load(f)['backend']
+            
+            if backend in BOOSTED_BACKENDS:
+                model = QuantileBoostedModel.load(f'{model_dir}/boosted')
+                leaf_values = None
+            elif self.mmap_model and FlatForest.exists(f'{model_dir}/forest'):
+                # Read-only mapping: pages are shared through the OS page cache, not copied
+                model = FlatForest.load(f'{model_dir}/forest', mmap_mode='r')
+                leaf_values = None
+                self._flat_source = (model, f'{model_dir}/flight_price_model.pkl')
+            elif not os.path.exists(f'{model_dir}/flight_price_model.pkl') and FlatForest.exists(f'{model_dir}/forest'):
+                # Saved from a memory-mapped forest whose pickle was unavailable; the flat arrays still serve
+                model = FlatForest.load(f'{model_dir}/forest', mmap_mode=None)
+                leaf_values = None
+            else:
+                model = joblib.load(f'{model_dir}/flight_price_model.pkl')
+                leaf_values = self._build_leaf_table(model)
             self.label_encoders = joblib.load(f'{model_dir}/label_encoders.pkl')
             self.scaler = joblib.load(f'{model_dir}/scaler.pkl')
+            self.holdout = self.load_holdout(f'{model_dir}/holdout.csv')
+            if os.path.exists(f'{model_dir}/city_index.json'):
+                with open(f'{model_dir}/city_index.json') as f:
+                    self.city_index = json.load(f)
+            else:
+                # Artifacts saved before the index existed: cities from the encoders, routes unknown
+                self.city_index = self._build_city_index()
+            self.route_catalog = RouteCatalog.load(f'{model_dir}/route_catalog.json')
+            self.category_codes = self._build_encoding_tables()
+            self._publish(model, leaf_values)
+            self.state = 'ready'
+            self.trend_cache.clear()
             print("Model loaded successfully!")
             return True
         except Exception as e:
@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Versioned model artifacts in one directory, with a pointer to the version being served.
+
+    Each version is a complete ``save_model()`` directory named v0001, v0002, ...
+    A version directory only appears once fully written, and a version number
+    is reserved by one process at a time, so several workers can publish at once. The ``CURRENT`` file
+    names the active version and is replaced atomically. ``holdout.csv`` is
+    the fixed benchmark every candidate is scored on; it is taken from the
+    first activated version that has one. Only the ``max_versions`` newest
+    versions are kept, and the active one is never removed.
+    """
+
+    def __init__(self, directory: str = 'model_registry', max_versions: int = 5):
+        self.directory = directory
+        self.max_versions = max_versions
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def holdout_path(self) -> str:
+        return os.path.join(self.directory, 'holdout.csv')
+
+    def path(self, version: str) -> str:
+        return os.path.join(self.directory, version)
+
+    def versions(self) -> List[str]:
+        """Published versions, oldest first"""
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith('v') and not name.endswith('.tmp')
+            and os.path.exists(os.path.join(self.directory, name, 'version.json'))
+        )
+
+    def latest(self) -> Optional[str]:
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def current(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, 'CURRENT')) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if os.path.isdir(self.path(version)) else None
+
+    def describe(self, version: str) -> Dict[str, Any]:
+        with open(os.path.join(self.path(version), 'version.json')) as f:
+            return json.load(f)
+
+    def publish(self, model, source: str, first_only: bool = False) -> Optional[str]:
+        """Save a trained FlightPriceMLModel as the next version without activating it.
+
+        With first_only, the model is published only as v0001, and None is
+        returned when that version is already taken.
+        """
+        version = self._reserve(first_only)
+        if version is None:
+            return None
+        # Named after the process too, so a staging directory is never shared
+        staging = f'{self.path(version)}.{os.getpid()}.tmp'
+        try:
+            model.save_model(staging)
+            # version.json marks the version complete, so write it last
+            with open(os.path.join(staging, 'version.json'), 'w') as f:
+                json.dump({'version': version, 'source': source, 'created_at': datetime.now().isoformat()}, f)
+            os.replace(staging, self.path(version))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+            os.remove(f'{self.path(version)}.lock')
+        logger.info(f"Published model {version} ({source})")
+        return version
+
+    def _reserve(self, first_only: bool) -> Optional[str]:
+        """Claim the next free version number with an O_EXCL lock file, so
+        processes publishing at the same time never get the same version"""
+        latest = self.latest()
+        number = 1 if first_only or latest is None else int(latest[1:]) + 1
+        while True:
+            version = f'v{number:04d}'
+            lock = f'{self.path(version)}.lock'
+            try:
+                os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            except FileExistsError:
+                # Being published by another process right now
+                if first_only:
+                    return None
+                number += 1
+                continue
+            if not os.path.exists(self.path(version)):
+                return version
+            # Published since latest() was read
+            os.remove(lock)
+            if first_only:
+                return None
+            number += 1
+
+    def activate(self, version: str) -> None:
+        """Point CURRENT at a version and adopt its holdout as the benchmark if there is none yet"""
+        candidate_holdout = os.path.join(self.path(version), 'holdout.csv')
+        if not os.path.exists(self.holdout_path) and os.path.exists(candidate_holdout):
+            shutil.copyfile(candidate_holdout, self.holdout_path)
+
+        pointer = os.path.join(self.directory, 'CURRENT')
+        with open(f'{pointer}.tmp', 'w') as f:
+            f.write(version)
+        os.replace(f'{pointer}.tmp', pointer)
+        self._prune(version)
+
+    def _prune(self, current: str) -> None:
+        for stale in self.versions()[:-self.max_versions]:
+            if stale != current:
+                shutil.rmtree(self.path(stale), ignore_errors=True)
@@ -0,0 +1,137 @@
+import logging
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from sklearn.ensemble import ExtraTreesRegressor, RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import KFold
+
+from boosted_models import QuantileBoostedModel
+
+try:
+    from xgboost import XGBRegressor
+except ImportError:  # xgboost is optional; its candidates are skipped without it
+    XGBRegressor = None
+
+logger = logging.getLogger(__name__)
+
+MODEL_FAMILIES = {
+    'random_forest': RandomForestRegressor,
+    'extra_trees': ExtraTreesRegressor,
+}
+if XGBRegressor is not None:
+    # Evaluated as the multi-quantile model train_model serves, so loss, size and latency match
+    MODEL_FAMILIES['xgboost'] = QuantileBoostedModel
+
+DEFAULT_SEARCH_SPACE = {
+    'random_forest': [{'n_estimators': n, 'max_depth': d} for n in (50, 100) for d in (12, 20)],
+    'extra_trees': [{'n_estimators': n, 'max_depth': d} for n in (50, 100) for d in (12, 20)],
+    'xgboost': [
+        {'n_estimators': n, 'max_depth': d, 'learning_rate': 0.1, 'tree_method': 'hist'}
+        for n in (200, 400) for d in (4, 6)
+    ],
+}
+# Single-row predictions timed per candidate to estimate scoring latency
+LATENCY_SAMPLES = 200
+
+# Training data shared by every search worker, sent once per process instead of once per task
+_search_X = None
+_search_y = None
+# Held while timing predictions so two workers never measure latency at the same time
+_latency_lock = None
+
+
+def make_estimator(family: str, params: Dict[str, Any], n_jobs: int = -1):
+    """Unfitted estimator of the given family; random_state is fixed so runs are reproducible.
+
+    Boosted families predict their median quantile, so candidates are scored on the median.
+    """
+    if MODEL_FAMILIES[family] is QuantileBoostedModel:
+        return QuantileBoostedModel(family, {**params, 'n_jobs': n_jobs})
+    return MODEL_FAMILIES[family](random_state=42, n_jobs=n_jobs, **params)
+
+
+def _init_search_worker(X: np.ndarray, y: np.ndarray, latency_lock) -> None:
+    global _search_X, _search_y, _latency_lock
+    _search_X, _search_y, _latency_lock = X, y, latency_lock
+
+
+def _evaluate_candidate(family: str, params: Dict[str, Any], n_splits: int) -> Dict[str, Any]:
+    """K-fold MAE and fit time, plus single-row scoring latency of the last fold's model"""
+    X, y = _search_X, _search_y
+    maes, fit_seconds = [], []
+    # Candidates run in parallel, so each fits single-threaded
+    for train_idx, valid_idx in KFold(n_splits=n_splits, shuffle=True, random_state=42).split(X):
+        model = make_estimator(family, params, n_jobs=1)
+        started = time.perf_counter()
+        model.fit(X[train_idx], y[train_idx])
+        fit_seconds.append(time.perf_counter() - started)
+        maes.append(mean_absolute_error(y[valid_idx], model.predict(X[valid_idx])))
+
+    rows = X[valid_idx[:LATENCY_SAMPLES]]
+    latencies = []
+    with _latency_lock:
+        model.predict(rows[:1])  # warm-up
+        for i in range(len(rows)):
+            started = time.perf_counter()
+            model.predict(rows[i:i + 1])
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    return {
+        'family': family,
+        'params': params,
+        'mae': float(np.mean(maes)),
+        'mae_std': float(np.std(maes)),
+        'fit_seconds': float(np.mean(fit_seconds)),
+        'p50_latency_ms': float(np.percentile(latencies, 50)),
+        'p99_latency_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+def latency_aware_score(result: Dict[str, Any], latency_weight: float,
+                        p99_budget_ms: Optional[float] = None) -> float:
+    """MAE in rupees plus latency_weight rupees per millisecond of p99 latency; inf over budget"""
+    if p99_budget_ms is not None and result['p99_latency_ms'] > p99_budget_ms:
+        return math.inf
+    return result['mae'] + latency_weight * result['p99_latency_ms']
+
+
+def run_search(X: np.ndarray, y: np.ndarray, search_space: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+               n_splits: int = 3, max_workers: Optional[int] = None,
+               latency_weight: float = 5.0, p99_budget_ms: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Cross-validate every candidate on a process pool and rank them by the latency-aware score.
+
+    Returns one result per candidate, best first. Candidates over the p99
+    budget score infinity and sort last.
+    """
+    search_space = search_space if search_space is not None else DEFAULT_SEARCH_SPACE
+    candidates = [
+        (family, params)
+        for family, grid in search_space.items()
+        if family in MODEL_FAMILIES
+        for params in grid
+    ]
+    if not candidates:
+        raise ValueError("Search space has no candidates for the available model families")
+
+    workers = min(len(candidates), max_workers or os.cpu_count() or 1)
+    logger.info(f"Evaluating {len(candidates)} candidates with {n_splits}-fold CV on {workers} processes")
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_search_worker,
+        initargs=(np.asarray(X), np.asarray(y), context.Lock())
+    ) as pool:
+        futures = [pool.submit(_evaluate_candidate, family, params, n_splits) for family, params in candidates]
+        results = [future.result() for future in futures]
+
+    for result in results:
+        result['score'] = latency_aware_score(result, latency_weight, p99_budget_ms)
+    results.sort(key=lambda result: result['score'])
+    return results
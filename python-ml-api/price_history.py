@@ -0,0 +1,131 @@
+import logging
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    id INTEGER PRIMARY KEY,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    observed_date TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    airline TEXT NOT NULL,
+    flight_number TEXT,
+    departure_time TEXT,
+    arrival_time TEXT,
+    duration TEXT,
+    stops INTEGER NOT NULL,
+    price INTEGER NOT NULL,
+    currency TEXT,
+    source TEXT,
+    flight_id TEXT
+);
+-- Covers daily route queries: the range scan and aggregation read only the index
+CREATE INDEX IF NOT EXISTS idx_prices_route_observed ON prices (origin, destination, observed_date, price);
+CREATE INDEX IF NOT EXISTS idx_prices_route_departure ON prices (origin, destination, departure_date);
+"""
+
+
+def parse_departure_time(departure_time: str, default: str = '10:00') -> str:
+    """24-hour HH:MM from a scraped time such as "2024-01-15 14:30" or "2:30 PM", else the default"""
+    match = re.search(r'(?<![\d:])([01]?\d|2[0-3]):([0-5]\d)(?![\d])(?::\d\d)?\s*([AaPp][Mm])?', departure_time or '')
+    if not match:
+        return default
+    hour, minute, meridiem = int(match.group(1)), match.group(2), (match.group(3) or '').upper()
+    if meridiem and hour <= 12:
+        hour = hour % 12 + (12 if meridiem == 'PM' else 0)
+    return f'{hour:02d}:{minute}'
+
+
+def parse_duration_hours(duration: str, default: float = 2.5) -> float:
+    """Hours in a scraped duration string such as "2h30m" or "3h" """
+    match = re.fullmatch(r'\s*(?:(\d+)h)?\s*(?:(\d+)m)?\s*', duration or '')
+    if not match or not any(match.groups()):
+        return default
+    hours, minutes = match.groups()
+    return int(hours or 0) + int(minutes or 0) / 60
+
+
+class PriceHistoryStore:
+    """Append-only SQLite store of every scraped flight price.
+
+    Rows are only ever inserted, in one transaction per batch. Route queries
+    are index range scans, so their cost follows the size of the range, not
+    of the table. WAL mode lets readers run while a batch is being written.
+    Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str = 'price_history.db'):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Durable at checkpoints rather than every commit; a crash can lose only the last batches
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def append(self, departure_date: str, flights: Iterable[Any]) -> int:
+        """Insert FlightData records from one search in a single transaction, returning the row count"""
+        return self.append_many((departure_date, flight) for flight in flights)
+
+    def append_many(self, records: Iterable[Tuple[str, Any]]) -> int:
+        """Insert (departure_date, FlightData) pairs, possibly from many searches, in a single transaction"""
+        rows = [
+            (
+                flight.origin, flight.destination, departure_date,
+                flight.scraped_at.date().isoformat(), flight.scraped_at.isoformat(),
+                flight.airline, flight.flight_number, flight.departure_time, flight.arrival_time,
+                flight.duration, flight.stops, flight.price, flight.currency, flight.source, flight.id
+            )
+            for departure_date, flight in records
+        ]
+        if not rows:
+            return 0
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                'INSERT INTO prices (origin, destination, departure_date, observed_date, observed_at, '
+                'airline, flight_number, departure_time, arrival_time, duration, stops, price, currency, '
+                'source, flight_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+        return len(rows)
+
+    def daily_prices(self, origin: str, destination: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Average, minimum, maximum and count of prices observed per day, start and end inclusive"""
+        cursor = self._connection().execute(
+            'SELECT observed_date, AVG(price), MIN(price), MAX(price), COUNT(*) FROM prices '
+            'WHERE origin = ? AND destination = ? AND observed_date BETWEEN ? AND ? '
+            'GROUP BY observed_date ORDER BY observed_date',
+            (origin, destination, start_date, end_date)
+        )
+        return [
+            {'date': day, 'avg_price': avg_price, 'min_price': min_price, 'max_price': max_price, 'samples': samples}
+            for day, avg_price, min_price, max_price, samples in cursor
+        ]
+
+    def observations(self, origin: str, destination: str, start_date: Optional[str] = None,
+                     end_date: Optional[str] = None) -> pd.DataFrame:
+        """Raw rows for a route, optionally within an observed-date range, for training and analysis"""
+        query = 'SELECT * FROM prices WHERE origin = ? AND destination = ?'
+        params = [origin, destination]
+        if start_date is not None:
+            query += ' AND observed_date >= ?'
+            params.append(start_date)
+        if end_date is not None:
+            query += ' AND observed_date <= ?'
+            params.append(end_date)
+        return pd.read_sql_query(query + ' ORDER BY observed_date', self._connection(), params=params)
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised instead of waiting when a token would arrive after the caller's timeout"""
+
+
+class TokenBucket:
+    """Token bucket shared by sync and async callers.
+
+    Each acquire reserves a token immediately (the balance may go negative)
+    and then sleeps until that token would have been refilled, so waiting
+    callers are served in arrival order without polling. A caller that would
+    wait past its timeout is rejected without taking a token, and an async
+    caller cancelled while waiting gives its token back.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.rejected = 0
+        self.refunded = 0
+        self.total_wait = 0.0
+
+    def _reserve(self, timeout: Optional[float] = None) -> float:
+        """Take one token and return how long the caller must wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if timeout is not None and wait > timeout:
+                self.rejected += 1
+                raise RateLimitTimeout(f"Next request slot is {wait:.1f}s away, beyond the {timeout:.1f}s timeout")
+            self._tokens -= 1
+            self.acquired += 1
+            self.total_wait += wait
+            return wait
+
+    def _refund(self, wait: float) -> None:
+        with self._lock:
+            self._tokens += 1
+            self.acquired -= 1
+            self.refunded += 1
+            self.total_wait -= wait
+
+    async def acquire(self, timeout: Optional[float] = None) -> None:
+        wait = self._reserve(timeout)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # The request never ran, so its slot goes to the next caller
+                self._refund(wait)
+                raise
+
+    def acquire_blocking(self, timeout: Optional[float] = None) -> None:
+        wait = self._reserve(timeout)
+        if wait > 0:
+            time.sleep(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'rate_per_second': self.rate,
+                'burst': self.capacity,
+                'acquired': self.acquired,
+                'rejected': self.rejected,
+                'refunded': self.refunded,
+                'avg_wait_seconds': round(self.total_wait / self.acquired, 3) if self.acquired else 0.0
+            }
+
+
+class HostRateLimiter:
+    """One token bucket per remote host, so politeness delays never cross hosts"""
+
+    def __init__(self, requests_per_second: float = 0.5, burst: float = 1.0):
+        if requests_per_second <= 0:
+            raise ValueError(f"requests_per_second must be positive, got {requests_per_second}")
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.requests_per_second, self.burst)
+            return self._buckets[host]
+
+    async def acquire(self, host: str, timeout: Optional[float] = None) -> None:
+        await self.bucket(host).acquire(timeout)
+
+    def acquire_blocking(self, host: str, timeout: Optional[float] = None) -> None:
+        self.bucket(host).acquire_blocking(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.stats() for host, bucket in buckets.items()}
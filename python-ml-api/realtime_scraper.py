@@ -2,13 +2,19 @@ import requests
 import json
 import asyncio
 import aiohttp
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Dict, Any, Optional
 from dataclasses import dataclass, asdict
 import logging
 from bs4 import BeautifulSoup
 import re
-import time
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+from caching import SingleFlightCache
+from history_writer import HistoryWriter
+from price_history import PriceHistoryStore
+from rate_limiter import HostRateLimiter
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,8 +38,40 @@ class FlightData:
     booking_url: Optional[str] = None
 
 class RealTimeFlightScraper:
-    def __init__(self):
+    def __init__(self, source_timeout: float = 10.0, search_deadline: float = 20.0,
+                 requests_per_second: float = 0.5, burst: float = 1.0, max_connections_per_host: int = 4,
+                 cache_ttl: float = 60, cache_stale_ttl: float = 0, cache_swr_min_hits: int = 3, cache_size: int = 512,
+                 cache_incomplete_ttl: float = 5,
+                 history_store: Optional[PriceHistoryStore] = None, history_writer: Optional[HistoryWriter] = None):
+        self.source_timeout = source_timeout
+        # Every scraped result is appended here; None keeps no history
+        self.history_store = history_store
+        # Async searches queue their results here instead of writing to the store themselves
+        self.history_writer = history_writer
+        # Called as on_results(origin, destination, departure_date, flights) once per fresh scrape
+        self.on_results: Optional[Callable[[str, str, str, List[FlightData]], None]] = None
+        self.search_deadline = search_deadline
+        self.max_connections_per_host = max_connections_per_host
+        
+        # Politeness budget is per source host and shared by every concurrent search
+        self.rate_limiter = HostRateLimiter(requests_per_second=requests_per_second, burst=burst)
+        self._async_sessions: Dict[str, aiohttp.ClientSession] = {}
+        
+        # Identical concurrent searches share one scrape; results stay fresh for cache_ttl
+        self.search_cache = SingleFlightCache(
+            max_size=cache_size,
+            fresh_ttl=cache_ttl,
+            stale_ttl=cache_stale_ttl,
+            swr_min_hits=cache_swr_min_hits,
+            # Empty scrapes and ones cut short by the deadline are retried soon instead of served for cache_ttl
+            incomplete_ttl=cache_incomplete_ttl,
+            is_complete=lambda result: result[1]
+        )
+        
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections_per_host, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -62,141 +100,294 @@ class RealTimeFlightScraper:
                 all_flights.extend(flights)
                 logger.info(f"Found {len(flights)} flights from {source_func.__name__}")
                 
-                # Add delay between requests to be respectful
-                time.sleep(2)
-                
             except Exception as e:
                 logger.error(f"Error searching {source_func.__name__}: {str(e)}")
                 continue
         
         # Remove duplicates and sort by price
-        unique_flights = self._remove_duplicates(all_flights)
-        return sorted(unique_flights, key=lambda x: x.price)
+        unique_flights = sorted(self._remove_duplicates(all_flights), key=lambda x: x.price)
+        self._record_history(departure_date, unique_flights)
+        self._notify_results(origin, destination, departure_date, unique_flights)
+        return unique_flights
+
+    async def search_flights_async(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> List[FlightData]:
+        """Cached, deduplicated search across all sources"""
+        flights, _ = await self.search_cache.get_or_load(
+            (origin, destination, departure_date, return_date),
+            lambda: self._search_all_sources_async(origin, destination, departure_date, return_date)
+        )
+        return list(flights)
+
+    async def _search_all_sources_async(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> tuple:
+        """Search all sources concurrently, returning (flights that finished before the deadline, complete),
+        where complete means every source finished and something was found"""
+        sources = {
+            'kayak': self._search_kayak_async(origin, destination, departure_date, return_date),
+            'expedia': self._search_expedia_async(origin, destination, departure_date, return_date),
+            'makemytrip': asyncio.to_thread(self._search_makemytrip, origin, destination, departure_date, return_date),
+            'cleartrip': asyncio.to_thread(self._search_cleartrip, origin, destination, departure_date, return_date)
+        }
+        tasks = {
+            asyncio.create_task(self._run_source_async(name, search)): name
+            for name, search in sources.items()
+        }
+        
+        done, pending = await asyncio.wait(tasks, timeout=self.search_deadline)
+        for task in pending:
+            task.cancel()
+            logger.warning(f"{tasks[task]} missed the {self.search_deadline}s search deadline, returning partial results")
+        
+        all_flights = []
+        for task in done:
+            all_flights.extend(task.result())
+        
+        # Remove duplicates and sort by price
+        unique_flights = sorted(self._remove_duplicates(all_flights), key=lambda x: x.price)
+        # Runs once per scrape, inside the cache loader, so cache hits are not recorded again
+        if self.history_writer is not None:
+            await self.history_writer.submit(departure_date, unique_flights)
+        else:
+            await asyncio.to_thread(self._record_history, departure_date, unique_flights)
+        self._notify_results(origin, destination, departure_date, unique_flights)
+        return unique_flights, not pending and bool(unique_flights)
+
+    def _record_history(self, departure_date: str, flights: List[FlightData]) -> None:
+        """Append one search's results to the history store in a single batch, never raising"""
+        if self.history_store is None:
+            return
+        try:
+            self.history_store.append(departure_date, flights)
+        except Exception as e:
+            logger.error(f"Recording price history failed: {str(e)}")
+
+    def _notify_results(self, origin: str, destination: str, departure_date: str, flights: List[FlightData]) -> None:
+        """Pass one scrape's results to on_results, never raising"""
+        if self.on_results is None:
+            return
+        try:
+            self.on_results(origin, destination, departure_date, flights)
+        except Exception as e:
+            logger.error(f"Handling scraped results failed: {str(e)}")
+
+    async def _run_source_async(self, name: str, search) -> List[FlightData]:
+        """Await one source under the per-source timeout, never raising"""
+        try:
+            flights = await asyncio.wait_for(search, timeout=self.source_timeout)
+            logger.info(f"Found {len(flights)} flights from {name}")
+            return flights
+        except asyncio.TimeoutError:
+            logger.warning(f"{name} timed out after {self.source_timeout}s")
+        except Exception as e:
+            logger.error(f"Error searching {name}: {str(e)}")
+        return []
+
+    def _get_async_session(self, host: str) -> aiohttp.ClientSession:
+        """Lazily create a keep-alive session with a bounded connection pool for one host"""
+        session = self._async_sessions.get(host)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections_per_host,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=30
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                headers=dict(self.session.headers),
+                timeout=aiohttp.ClientTimeout(total=self.source_timeout)
+            )
+            self._async_sessions[host] = session
+        return session
+
+    def _fetch(self, url: str) -> requests.Response:
+        """Rate-limited blocking GET through the pooled requests session"""
+        # A slot further away than the source timeout would only be abandoned, so fail fast instead
+        self.rate_limiter.acquire_blocking(urlparse(url).netloc, timeout=self.source_timeout)
+        return self.session.get(url, timeout=15)
+
+    async def _fetch_async(self, url: str) -> tuple:
+        """Rate-limited GET through the host's pooled aiohttp session, returning (status, body)"""
+        host = urlparse(url).netloc
+        await self.rate_limiter.acquire(host, timeout=self.source_timeout)
+        async with self._get_async_session(host).get(url) as response:
+            if response.status != 200:
+                return response.status, b''
+            return response.status, await response.read()
+
+    def rate_limit_stats(self) -> Dict[str, Any]:
+        return self.rate_limiter.stats()
+
+    async def close(self):
+        """Close the per-host aiohttp sessions"""
+        for session in self._async_sessions.values():
+            if not session.closed:
+                await session.close()
+        self._async_sessions.clear()
+
+    def _kayak_url(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> str:
+        # Convert city names to airport codes
+        origin_code = self._get_airport_code(origin)
+        dest_code = self._get_airport_code(destination)
+        
+        # Format the search URL
+        url = f"https://www.kayak.com/flights/{origin_code}-{dest_code}/{departure_date}"
+        if return_date:
+            url += f"/{return_date}"
+        return url
 
     def _search_kayak(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> List[FlightData]:
         """Search flights from Kayak"""
         flights = []
         
         try:
-            # Convert city names to airport codes
-            origin_code = self._get_airport_code(origin)
-            dest_code = self._get_airport_code(destination)
-            
-            # Format the search URL
-            trip_type = "roundtrip" if return_date else "oneway"
-            url = f"https://www.kayak.com/flights/{origin_code}-{dest_code}/{departure_date}"
-            if return_date:
-                url += f"/{return_date}"
-            
+            url = self._kayak_url(origin, destination, departure_date, return_date)
             logger.info(f"Searching Kayak: {url}")
             
             # Make request with proper headers
-            response = self.session.get(url, timeout=15)
+            response = self._fetch(url)
             if response.status_code != 200:
                 logger.warning(f"Kayak returned status code: {response.status_code}")
                 return flights
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for flight results in the page
-            # Note: This is a simplified version - real scraping would need to handle JavaScript rendering
-            flight_elements = soup.find_all('div', class_=re.compile('listWrapper|resultWrapper'))
-            
-            for element in flight_elements[:10]:  # Limit to 10 results
-                try:
-                    # Extract flight information (simplified)
-                    price_elem = element.find(class_=re.compile('price|cost'))
-                    airline_elem = element.find(class_=re.compile('airline|carrier'))
-                    time_elem = element.find(class_=re.compile('time|departure'))
-                    
-                    if price_elem and airline_elem:
-                        price_text = price_elem.get_text(strip=True)
-                        price_match = re.search(r'[\d,]+', price_text.replace(',', ''))
-                        
-                        if price_match:
-                            flight = FlightData(
-                                id=f"kayak_{hash(str(element))}",
-                                airline=airline_elem.get_text(strip=True)[:20],
-                                flight_number="N/A",
-                                departure_time=departure_date + " 10:00",  # Default time
-                                arrival_time=departure_date + " 12:00",   # Default time
-                                duration="2h",
-                                origin=origin,
-                                destination=destination,
-                                price=int(price_match.group()),
-                                currency="INR",
-                                stops=0,
-                                source="kayak",
-                                scraped_at=datetime.now(),
-                                booking_url=url
-                            )
-                            flights.append(flight)
-                            
-                except Exception as e:
-                    logger.debug(f"Error parsing Kayak flight element: {str(e)}")
-                    continue
+            flights = self._parse_kayak(response.content, url, origin, destination, departure_date)
                     
         except Exception as e:
             logger.error(f"Error searching Kayak: {str(e)}")
             
         return flights
 
-    def _search_expedia(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> List[FlightData]:
-        """Search flights from Expedia"""
+    async def _search_kayak_async(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> List[FlightData]:
+        """Search flights from Kayak without blocking the event loop"""
+        url = self._kayak_url(origin, destination, departure_date, return_date)
+        logger.info(f"Searching Kayak: {url}")
+        
+        status, content = await self._fetch_async(url)
+        if status != 200:
+            logger.warning(f"Kayak returned status code: {status}")
+            return []
+        
+        # HTML parsing is CPU-bound, keep it off the event loop too
+        return await asyncio.to_thread(self._parse_kayak, content, url, origin, destination, departure_date)
+
+    def _parse_kayak(self, content: bytes, url: str, origin: str, destination: str, departure_date: str) -> List[FlightData]:
+        """Extract flights from a Kayak results page"""
         flights = []
+        soup = BeautifulSoup(content, 'html.parser')
         
-        try:
-            # Similar implementation for Expedia
-            origin_code = self._get_airport_code(origin)
-            dest_code = self._get_airport_code(destination)
-            
-            # Expedia URL format
-            url = f"https://www.expedia.com/Flights-Search?trip=oneway&leg1=from:{origin_code},to:{dest_code},departure:{departure_date}TANYT"
-            
-            logger.info(f"Searching Expedia: {url}")
-            
-            response = self.session.get(url, timeout=15)
-            if response.status_code != 200:
-                return flights
+        # Look for flight results in the page
+        # Note: This is a simplified version - real scraping would need to handle JavaScript rendering
+        flight_elements = soup.find_all('div', class_=re.compile('listWrapper|resultWrapper'))
+        
+        for element in flight_elements[:10]:  # Limit to 10 results
+            try:
+                # Extract flight information (simplified)
+                price_elem = element.find(class_=re.compile('price|cost'))
+                airline_elem = element.find(class_=re.compile('airline|carrier'))
+                time_elem = element.find(class_=re.compile('time|departure'))
                 
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract flight data from Expedia's structure
-            # This is a placeholder implementation
-            price_elements = soup.find_all(class_=re.compile('price|cost'))
-            
-            for i, price_elem in enumerate(price_elements[:5]):
-                try:
+                if price_elem and airline_elem:
                     price_text = price_elem.get_text(strip=True)
                     price_match = re.search(r'[\d,]+', price_text.replace(',', ''))
                     
                     if price_match:
                         flight = FlightData(
-                            id=f"expedia_{i}",
-                            airline="Various Airlines",
-                            flight_number="EXP001",
-                            departure_time=departure_date + " 11:00",
-                            arrival_time=departure_date + " 13:30",
-                            duration="2h30m",
+                            id=f"kayak_{hash(str(element))}",
+                            airline=airline_elem.get_text(strip=True)[:20],
+                            flight_number="N/A",
+                            departure_time=departure_date + " 10:00",  # Default time
+                            arrival_time=departure_date + " 12:00",   # Default time
+                            duration="2h",
                             origin=origin,
                             destination=destination,
                             price=int(price_match.group()),
                             currency="INR",
                             stops=0,
-                            source="expedia",
+                            source="kayak",
                             scraped_at=datetime.now(),
                             booking_url=url
                         )
                         flights.append(flight)
                         
-                except Exception as e:
-                    continue
+            except Exception as e:
+                logger.debug(f"Error parsing Kayak flight element: {str(e)}")
+                continue
+        
+        return flights
+
+    def _expedia_url(self, origin: str, destination: str, departure_date: str) -> str:
+        origin_code = self._get_airport_code(origin)
+        dest_code = self._get_airport_code(destination)
+        
+        # Expedia URL format
+        return f"https://www.expedia.com/Flights-Search?trip=oneway&leg1=from:{origin_code},to:{dest_code},departure:{departure_date}TANYT"
+
+    def _search_expedia(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> List[FlightData]:
+        """Search flights from Expedia"""
+        flights = []
+        
+        try:
+            url = self._expedia_url(origin, destination, departure_date)
+            logger.info(f"Searching Expedia: {url}")
+            
+            response = self._fetch(url)
+            if response.status_code != 200:
+                return flights
+                
+            flights = self._parse_expedia(response.content, url, origin, destination, departure_date)
                     
         except Exception as e:
             logger.error(f"Error searching Expedia: {str(e)}")
             
         return flights
 
+    async def _search_expedia_async(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> List[FlightData]:
+        """Search flights from Expedia without blocking the event loop"""
+        url = self._expedia_url(origin, destination, departure_date)
+        logger.info(f"Searching Expedia: {url}")
+        
+        status, content = await self._fetch_async(url)
+        if status != 200:
+            return []
+        
+        return await asyncio.to_thread(self._parse_expedia, content, url, origin, destination, departure_date)
+
+    def _parse_expedia(self, content: bytes, url: str, origin: str, destination: str, departure_date: str) -> List[FlightData]:
+        """Extract flights from an Expedia results page"""
+        flights = []
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Extract flight data from Expedia's structure
+        # This is a placeholder implementation
+        price_elements = soup.find_all(class_=re.compile('price|cost'))
+        
+        for i, price_elem in enumerate(price_elements[:5]):
+            try:
+                price_text = price_elem.get_text(strip=True)
+                price_match = re.search(r'[\d,]+', price_text.replace(',', ''))
+                
+                if price_match:
+                    flight = FlightData(
+                        id=f"expedia_{i}",
+                        airline="Various Airlines",
+                        flight_number="EXP001",
+                        departure_time=departure_date + " 11:00",
+                        arrival_time=departure_date + " 13:30",
+                        duration="2h30m",
+                        origin=origin,
+                        destination=destination,
+                        price=int(price_match.group()),
+                        currency="INR",
+                        stops=0,
+                        source="expedia",
+                        scraped_at=datetime.now(),
+                        booking_url=url
+                    )
+                    flights.append(flight)
+                    
+            except Exception as e:
+                continue
+        
+        return flights
+
     def _search_makemytrip(self, origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> List[FlightData]:
         """Search flights from MakeMyTrip (Indian travel site)"""
         flights = []
@@ -309,39 +500,32 @@ class RealTimeFlightScraper:
         return unique_flights
 
     def get_historical_prices(self, origin: str, destination: str, days_back: int = 30) -> List[Dict[str, Any]]:
-        """Get historical price data for ML training"""
-        historical_data = []
-        
-        # Generate sample historical data
-        base_date = datetime.now() - timedelta(days=days_back)
-        base_price = 4500
+        """Daily prices observed on a route over the last days_back days, from the history store"""
+        if self.history_store is None:
+            return []
         
-        for i in range(days_back):
-            date = base_date + timedelta(days=i)
-            
-            # Simulate price variations
-            day_of_week = date.weekday()
-            weekend_multiplier = 1.2 if day_of_week >= 5 else 1.0
-            season_multiplier = 1.1 if date.month in [12, 1, 4, 5] else 1.0
-            random_factor = (hash(str(date)) % 200 - 100) / 100 * 0.1  # ±10% random variation
-            
-            price = int(base_price * weekend_multiplier * season_multiplier * (1 + random_factor))
-            
+        end_date = date.today()
+        start_date = end_date - timedelta(days=days_back - 1)
+        historical_data = []
+        for day in self.history_store.daily_prices(origin, destination, start_date.isoformat(), end_date.isoformat()):
+            observed = date.fromisoformat(day['date'])
             historical_data.append({
-                'date': date.isoformat().split('T')[0],
-                'price': price,
-                'day_of_week': day_of_week,
-                'is_weekend': day_of_week >= 5,
-                'month': date.month,
+                'date': day['date'],
+                'price': int(round(day['avg_price'])),
+                'min_price': day['min_price'],
+                'max_price': day['max_price'],
+                'samples': day['samples'],
+                'day_of_week': observed.weekday(),
+                'is_weekend': observed.weekday() >= 5,
+                'month': observed.month,
                 'origin': origin,
                 'destination': destination
             })
-            
         return historical_data
 
 # Test the scraper
 if __name__ == "__main__":
-    scraper = RealTimeFlightScraper()
+    scraper = RealTimeFlightScraper(history_store=PriceHistoryStore())
     
     # Test flight search
     flights = scraper.search_flights("Delhi", "Mumbai", "2024-08-25")
@@ -352,7 +536,7 @@ if __name__ == "__main__":
     
     # Test historical data
     historical = scraper.get_historical_prices("Delhi", "Mumbai")
-    print(f"\nGenerated {len(historical)} historical price points")
+    print(f"\nFound {len(historical)} days of price history")
     
     # Save sample data
     with open('sample_flight_data.json', 'w') as f:
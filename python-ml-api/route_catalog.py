@@ -0,0 +1,234 @@
+import json
+import math
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Log-spaced price bins about 1% wide, so histogram percentiles are within about 1%
+PRICE_BIN_EDGES = np.geomspace(500, 500_000, 695)
+DURATION_BIN_HOURS = 0.25
+DURATION_BINS = 193  # 0 to 48 hours
+DEFAULT_DURATION_HOURS = 2.5
+PERCENTILES = (10, 25, 50, 75, 90)
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+
+class RouteStats:
+    """Running aggregates for one route: totals plus fixed-bin price, weekday and duration histograms.
+
+    Every field is a sum, so adding prices never revisits old ones. The
+    summary is rebuilt lazily, once per batch of updates.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.price_sum = 0.0
+        self.min_price = math.inf
+        self.max_price = 0.0
+        self.price_histogram = np.zeros(len(PRICE_BIN_EDGES) + 1, dtype=np.int64)
+        self.weekday_counts = np.zeros(7, dtype=np.int64)
+        self.weekday_sums = np.zeros(7)
+        self.duration_histogram = np.zeros(DURATION_BINS, dtype=np.int64)
+        self.airline_counts = {}
+        self.airline_sums = {}
+        self._summary = None
+
+    def add(self, prices: np.ndarray, weekdays: Optional[np.ndarray], durations: np.ndarray,
+            airlines: np.ndarray) -> None:
+        """Fold in a batch of prices; weekdays is None when the source has no departure dates,
+        and -1 marks individual rows without one"""
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) == 0:
+            return
+        self.count += len(prices)
+        self.price_sum += float(prices.sum())
+        self.min_price = min(self.min_price, float(prices.min()))
+        self.max_price = max(self.max_price, float(prices.max()))
+        self.price_histogram += np.bincount(
+            np.searchsorted(PRICE_BIN_EDGES, prices, side='right'), minlength=len(self.price_histogram)
+        )
+
+        if weekdays is not None:
+            weekdays = np.asarray(weekdays, dtype=np.int64)
+            dated = weekdays >= 0
+            self.weekday_counts += np.bincount(weekdays[dated], minlength=7)
+            self.weekday_sums += np.bincount(weekdays[dated], weights=prices[dated], minlength=7)
+
+        durations = np.asarray(durations, dtype=np.float64)
+        durations = durations[np.isfinite(durations)]
+        bins = np.clip(np.rint(durations / DURATION_BIN_HOURS).astype(np.int64), 0, DURATION_BINS - 1)
+        self.duration_histogram += np.bincount(bins, minlength=DURATION_BINS)
+
+        names, inverse = np.unique(np.asarray(airlines, dtype=str), return_inverse=True)
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=prices)
+        for name, count, total in zip(names.tolist(), counts.tolist(), sums.tolist()):
+            self.airline_counts[name] = self.airline_counts.get(name, 0) + count
+            self.airline_sums[name] = self.airline_sums.get(name, 0.0) + total
+        self._summary = None
+
+    def summary(self) -> Dict[str, Any]:
+        if self._summary is None:
+            self._summary = self._summarize()
+        return self._summary
+
+    def _summarize(self) -> Dict[str, Any]:
+        cumulative = np.cumsum(self.price_histogram)
+        percentiles = {}
+        for q in PERCENTILES:
+            i = int(np.searchsorted(cumulative, q / 100 * self.count, side='left'))
+            # Geometric centre of the bin, kept inside the observed range
+            low = PRICE_BIN_EDGES[i - 1] if i > 0 else self.min_price
+            high = PRICE_BIN_EDGES[i] if i < len(PRICE_BIN_EDGES) else self.max_price
+            percentiles[f'p{q}'] = int(round(min(max(math.sqrt(low * high), self.min_price), self.max_price)))
+
+        duration_cumulative = np.cumsum(self.duration_histogram)
+        typical_duration = DEFAULT_DURATION_HOURS
+        if duration_cumulative[-1] > 0:
+            median_bin = int(np.searchsorted(duration_cumulative, duration_cumulative[-1] / 2, side='left'))
+            typical_duration = median_bin * DURATION_BIN_HOURS
+
+        return {
+            'samples': self.count,
+            'avg_price': int(round(self.price_sum / self.count)),
+            'min_price': int(round(self.min_price)),
+            'max_price': int(round(self.max_price)),
+            'percentiles': percentiles,
+            'day_of_week_profile': {
+                WEEKDAYS[day]: {'avg_price': int(round(self.weekday_sums[day] / count)), 'samples': int(count)}
+                for day, count in enumerate(self.weekday_counts.tolist()) if count
+            },
+            'airline_mix': {
+                airline: {
+                    'share': round(count / self.count, 4),
+                    'avg_price': int(round(self.airline_sums[airline] / count))
+                }
+                for airline, count in sorted(self.airline_counts.items(), key=lambda item: -item[1])
+            },
+            'typical_duration_hours': typical_duration
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'price_sum': self.price_sum,
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+            'price_histogram': self.price_histogram.tolist(),
+            'weekday_counts': self.weekday_counts.tolist(),
+            'weekday_sums': self.weekday_sums.tolist(),
+            'duration_histogram': self.duration_histogram.tolist(),
+            'airline_counts': self.airline_counts,
+            'airline_sums': self.airline_sums
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RouteStats':
+        stats = cls()
+        stats.count = data['count']
+        stats.price_sum = data['price_sum']
+        stats.min_price = data['min_price']
+        stats.max_price = data['max_price']
+        stats.price_histogram = np.array(data['price_histogram'], dtype=np.int64)
+        stats.weekday_counts = np.array(data['weekday_counts'], dtype=np.int64)
+        stats.weekday_sums = np.array(data['weekday_sums'], dtype=np.float64)
+        stats.duration_histogram = np.array(data['duration_histogram'], dtype=np.int64)
+        stats.airline_counts = dict(data['airline_counts'])
+        stats.airline_sums = dict(data['airline_sums'])
+        return stats
+
+
+class RouteCatalog:
+    """Aggregate price statistics per (source_city, destination_city), built from training data
+    and updated with observed prices.
+
+    Summaries are cached per route until the route's next update, so reads are
+    a dictionary lookup. Treat returned summaries as read-only.
+    """
+
+    def __init__(self):
+        self._routes: Dict[Tuple[str, str], RouteStats] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def add_arrays(self, sources, destinations, prices, weekdays, durations, airlines) -> None:
+        """Bulk-add parallel arrays, one vectorized update per route; weekdays may be None"""
+        frame = pd.DataFrame({'source': sources, 'destination': destinations})
+        columns = [None if values is None else np.asarray(values) for values in (prices, weekdays, durations, airlines)]
+        with self._lock:
+            for route, index in frame.groupby(['source', 'destination'], sort=False).indices.items():
+                stats = self._routes.setdefault((str(route[0]), str(route[1])), RouteStats())
+                stats.add(*(None if values is None else values[index] for values in columns))
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Add observed prices given as flight parameters plus 'price'"""
+        records = list(records)
+        if not records:
+            return
+        self.add_arrays(
+            [record['source_city'] for record in records],
+            [record['destination_city'] for record in records],
+            [record['price'] for record in records],
+            [_weekday(record.get('departure_date')) for record in records],
+            [record.get('journey_duration_hours', np.nan) for record in records],
+            [record['airline'] for record in records]
+        )
+
+    def summary(self, source_city: str, destination_city: str) -> Optional[Dict[str, Any]]:
+        """Aggregates for a route, or None when it has never been seen"""
+        stats = self._routes.get((source_city, destination_city))
+        if stats is None:
+            return None
+        with self._lock:
+            return stats.summary()
+
+    def typical_duration(self, source_city: str, destination_city: str,
+                         default: float = DEFAULT_DURATION_HOURS) -> float:
+        summary = self.summary(source_city, destination_city)
+        return summary['typical_duration_hours'] if summary else default
+
+    def routes(self) -> List[Tuple[str, str]]:
+        return sorted(self._routes)
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            data = [
+                {'source_city': source, 'destination_city': destination, **stats.to_dict()}
+                for (source, destination), stats in self._routes.items()
+            ]
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path: str) -> 'RouteCatalog':
+        """Catalog saved by save(), or an empty one when the file is missing"""
+        catalog = cls()
+        if os.path.exists(path):
+            with open(path) as f:
+                for entry in json.load(f):
+                    route = (entry.pop('source_city'), entry.pop('destination_city'))
+                    catalog._routes[route] = RouteStats.from_dict(entry)
+        return catalog
+
+
+def _weekday(departure_date: Any) -> int:
+    """Weekday of a YYYY-MM-DD date, or -1 when it cannot be parsed"""
+    try:
+        return datetime.strptime(departure_date, '%Y-%m-%d').weekday()
+    except (TypeError, ValueError):
+        return -1
+
+
+def price_percentile(summary: Dict[str, Any], price: float) -> float:
+    """Approximate percentile of a price within a route summary, interpolated between its percentiles"""
+    points = [(0, summary['min_price'])] + [
+        (q, summary['percentiles'][f'p{q}']) for q in PERCENTILES
+    ] + [(100, summary['max_price'])]
+    ranks, prices = zip(*points)
+    return round(float(np.interp(price, prices, ranks)), 1)